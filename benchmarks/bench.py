@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import generate_site
+
+
+def peak_rss():
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / 1024 if sys.platform == "darwin" else rss
+
+
+def count_pages(path):
+    pages = 0
+    for subdir, dirs, files in os.walk(path):
+        pages += sum(1 for file in files if file.endswith(".html"))
+    return pages
+
+
+def run_build(work, site, db_path, result_path, gasper_args):
+    """Runs in a child process so peak RSS belongs to this build alone."""
+    import sqlite_mysql
+    sqlite_mysql.install(db_path)
+    from gasper.gasper import Gasper
+
+    os.chdir(work)
+    sys.argv = ["gasper", site, "--build"] + gasper_args
+    start = time.perf_counter()
+    gasper = Gasper()
+    gasper.build()
+    wall = time.perf_counter() - start
+    with open(result_path, "w") as f:
+        json.dump({ "wall": wall, "pages": count_pages("dist"), "rss": peak_rss() }, f)
+
+
+def build(work, gasper_args, quiet):
+    result_path = os.path.join(work, "result.json")
+    output = subprocess.DEVNULL if quiet else None
+    subprocess.run([sys.executable, os.path.abspath(__file__), "--run-build", work, "site", "data.db", result_path, *gasper_args], check=True, stdout=output)
+    with open(result_path) as f:
+        return json.load(f)
+
+
+def clean(work):
+    for name in ("dist", ".gasper-cache"):
+        shutil.rmtree(os.path.join(work, name), ignore_errors=True)
+
+
+def summarise(results):
+    wall = statistics.median(result["wall"] for result in results)
+    pages = results[0]["pages"]
+    return {
+        "wall": wall,
+        "pages": pages,
+        "pages_per_second": pages / wall if wall > 0 else 0,
+        "rss_mb": max(result["rss"] for result in results) / 1024,
+        "runs": [result["wall"] for result in results]
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"{"build":<14}{"wall (s)":>10}{"pages":>8}{"pages/s":>10}{"peak RSS (MB)":>15}")
+    for name, result in report["builds"].items():
+        line = f"{name:<14}{result["wall"]:>10.3f}{result["pages"]:>8}{result["pages_per_second"]:>10.1f}{result["rss_mb"]:>15.1f}"
+        if baseline is not None and name in baseline["builds"]:
+            line += f"   {result["wall"] / baseline["builds"][name]["wall"]:.2f}x wall, {result["rss_mb"] / baseline["builds"][name]["rss_mb"]:.2f}x RSS"
+        print(line)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--run-build":
+        run_build(*sys.argv[2:6], sys.argv[6:])
+        return
+
+    parser = argparse.ArgumentParser(description="Build a synthetic site and report wall time, peak RSS and pages/sec.")
+    parser.add_argument("--pages", type=int, default=200, help="plain markdown pages")
+    parser.add_argument("--posts", type=int, default=200, help="posts under _posts")
+    parser.add_argument("--rows", type=int, default=200, help="rows in the mysql generator table, one page each")
+    parser.add_argument("--related", type=int, default=3, help="related rows per generator row")
+    parser.add_argument("--layout-depth", type=int, default=2, help="length of the layout chain")
+    parser.add_argument("--includes", type=int, default=2, help="includes in the outermost layout")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="builds per scenario; the median is reported")
+    parser.add_argument("--jobs", type=int, default=1, help="passed to gasper --jobs")
+    parser.add_argument("--incremental", action="store_true", help="also time a no-op incremental rebuild")
+    parser.add_argument("--work", help="directory to build in (default: a temporary directory)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results of an earlier --json run to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show gasper's output")
+    args = parser.parse_args()
+
+    work = args.work or tempfile.mkdtemp(prefix="gasper-bench-")
+    os.makedirs(work, exist_ok=True)
+    shutil.rmtree(os.path.join(work, "site"), ignore_errors=True)
+    params = { name: getattr(args, name) for name in ("pages", "posts", "rows", "related", "layout_depth", "includes", "seed", "jobs") }
+    generate_site(os.path.join(work, "site"), os.path.join(work, "data.db"), args.pages, args.posts, args.rows, args.related, args.layout_depth, args.includes, args.seed)
+
+    gasper_args = ["--jobs", str(args.jobs)] if args.jobs > 1 else []
+    report = { "params": params, "builds": {} }
+    results = []
+    for _ in range(args.repeat):
+        clean(work)
+        results.append(build(work, gasper_args, not args.verbose))
+    report["builds"]["full"] = summarise(results)
+
+    if args.incremental:
+        clean(work)
+        build(work, gasper_args + ["--incremental"], not args.verbose)
+        results = [build(work, gasper_args + ["--incremental"], not args.verbose) for _ in range(args.repeat)]
+        report["builds"]["incremental"] = summarise(results)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["params"] != params:
+            print(f"warning: {args.compare} was run with {baseline["params"]}")
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+    if args.work is None:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import re
+from peewee import SqliteDatabase
+
+from gasper.generator import mysql
+
+
+SHOW_COLUMNS_PATTERN = re.compile(r"^SHOW (?:FULL )?COLUMNS FROM \w+\.(\w+);$")
+CHECKSUM_PATTERN = re.compile(r"^CHECKSUM TABLE \w+\.(\w+);$")
+QUALIFIED_TABLE_PATTERN = re.compile(r"FROM \w+\.(\w+)")
+FORMAT_PATTERN = re.compile(r"%(%|s)")
+
+path = None
+
+
+class SQLiteMySQL(SqliteDatabase):
+    """Answers the queries the mysql generator sends from an SQLite file, whatever database it asks for."""
+
+    def __init__(self, db, host=None, port=None, user=None, passwd=None, **kwargs):
+        super().__init__(path)
+
+    def close_all(self):
+        self.close()
+
+    def execute_sql(self, sql, params=None, *args, **kwargs):
+        m = SHOW_COLUMNS_PATTERN.match(sql)
+        if m:
+            # SQLite compares text byte for byte, like a binary collation
+            sql = f"SELECT name, type, NULL FROM pragma_table_info('{m.group(1)}')"
+        m = CHECKSUM_PATTERN.match(sql)
+        if m:
+            sql = f"SELECT '{m.group(1)}', COUNT(*) || '-' || MAX(rowid) FROM {m.group(1)}"
+        # pymysql %-formats every query, so %s is a placeholder and %% a literal %
+        sql = FORMAT_PATTERN.sub(lambda m: "?" if m.group(1) == "s" else "%", QUALIFIED_TABLE_PATTERN.sub(r"FROM \1", sql))
+        return super().execute_sql(sql, params, *args, **kwargs)
+
+
+def install(db_path):
+    """Point every mysql generator at `db_path`; worker processes started with fork inherit it."""
+    global path
+    path = db_path
+    mysql.PooledMySQLDatabase = SQLiteMySQL
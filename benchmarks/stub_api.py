@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+COMMENTS_PATTERN = re.compile(r"^/posts/(\d+)/comments$")
+
+
+class StubAPI(ThreadingHTTPServer):
+    """A JSON API for trying the http generator: paginated /posts, /posts/<id>/comments, ETags, latency and failures."""
+
+    daemon_threads = True
+
+    def __init__(self, address, posts=100, comments=3, latency=0.0, fail_every=0):
+        super().__init__(address, Handler)
+        self.posts = [{ "id": i, "title": f"Post {i}", "slug": f"post-{i}", "body": f"Body of post {i}." } for i in range(1, posts + 1)]
+        self.comments = comments
+        self.latency = latency
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def count(self):
+        with self.lock:
+            self.requests += 1
+            return self.requests
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        number = server.count()
+        time.sleep(server.latency)
+        if server.fail_every and number % server.fail_every == 0:
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        headers = {}
+        m = COMMENTS_PATTERN.match(url.path)
+        if url.path == "/posts":
+            page = int(query.get("page", ["1"])[0])
+            per_page = int(query.get("per_page", ["10"])[0])
+            last_page = max(1, -(-len(server.posts) // per_page))
+            body = { "data": server.posts[(page - 1) * per_page:page * per_page], "meta": { "page": page, "last_page": last_page } }
+            if page < last_page:
+                headers["Link"] = f'</posts?page={page + 1}&per_page={per_page}>; rel="next"'
+        elif m:
+            post = int(m.group(1))
+            body = [{ "id": post * 100 + i, "post": post, "text": f"Comment {i} on post {post}" } for i in range(1, server.comments + 1)]
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        content = json.dumps(body).encode("utf-8")
+        etag = '"' + hashlib.sha1(content).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            with server.lock:
+                server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("ETag", etag)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def start(port=0, **kwargs):
+    """Serve a StubAPI from a background thread; stop it with `server.shutdown()`."""
+    server = StubAPI(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a stub JSON API for the http generator")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--comments", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each response")
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth request with 503")
+    options = parser.parse_args()
+    server = StubAPI(("127.0.0.1", options.port), options.posts, options.comments, options.latency, options.fail_every)
+    print(f"serving {server.url}/posts and {server.url}/posts/<id>/comments")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
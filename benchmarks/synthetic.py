@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import os
+import random
+import sqlite3
+
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore magna aliqua".split()
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def paragraphs(rng, count=3):
+    return "\n\n".join(" ".join(sentence(rng) for _ in range(4)) for _ in range(count))
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def write_layouts(path, depth, includes):
+    for level in range(depth):
+        matter = f"---\nlayout: layout{level + 1}\n---\n" if level < depth - 1 else ""
+        body = f"<div class=\"level{level}\">{{{{ content }}}}</div>"
+        if level == depth - 1:
+            body = "<html><head><title>{{ page.title }} | {{ site.title }}</title></head><body>" + "".join(f"{{% include \"include{number}.html\" %}}" for number in range(includes)) + body + "</body></html>"
+        write(os.path.join(path, "_layout", f"layout{level}.html"), matter + body + "\n")
+    for number in range(includes):
+        write(os.path.join(path, "_include", f"include{number}.html"), f"<nav class=\"include{number}\">{{{{ site.title }}}} / {{{{ page.title }}}}{{% for link in site.links %}} <a href=\"{{{{ link }}}}\">{{{{ link }}}}</a>{{% endfor %}}</nav>\n")
+
+
+def write_pages(path, rng, pages):
+    for number in range(pages):
+        write(os.path.join(path, "pages", f"page{number}.md"), f"---\ntitle: Page {number}\nlayout: layout0\n---\n# {{{{ page.title }}}}\n\n{paragraphs(rng)}\n\n* one\n* two\n* three\n")
+
+
+def write_posts(path, rng, posts):
+    for number in range(posts):
+        year = 2000 + number // 336
+        month = number // 28 % 12 + 1
+        day = number % 28 + 1
+        write(os.path.join(path, "_posts", f"{year}-{month}-{day}-post-{number}.md"), f"---\ntitle: Post {number}\n---\n## {{{{ page.date }}}}\n\n{paragraphs(rng)}\n")
+    if posts > 0:
+        write(os.path.join(path, "blog", "index.html"), "---\ntitle: Blog\nlayout: layout0\ngenerator:\n    from: posts\n    skip: true\n---\n<ul>{% for post in page.generator.rows %}<li><a href=\"/{{ post.permalink }}\">{{ post.title }}</a></li>{% endfor %}</ul>\n")
+        write(os.path.join(path, "blog", "post.md"), "---\ntitle: {{ page.generator.row.title }}\nlayout: layout0\ngenerator:\n    from: posts\npermalink: {{ page.generator.row.permalink }}\n---\n{{ page.generator.row.content }}\n")
+
+
+def write_items(path, db_path, rng, rows, related):
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    db = sqlite3.connect(db_path)
+    db.execute("CREATE TABLE item (id INTEGER PRIMARY KEY, title TEXT, groupId INTEGER, body TEXT)")
+    db.execute("CREATE TABLE tag (id INTEGER PRIMARY KEY, itemId INTEGER, name TEXT)")
+    db.execute("CREATE TABLE category (groupId INTEGER PRIMARY KEY, name TEXT)")
+    groups = max(1, rows // 10)
+    db.executemany("INSERT INTO item VALUES (?, ?, ?, ?)", ((number, f"Item {number}", number % groups, sentence(rng, 40)) for number in range(rows)))
+    db.executemany("INSERT INTO tag (itemId, name) VALUES (?, ?)", ((number, rng.choice(WORDS)) for number in range(rows) for _ in range(related)))
+    db.executemany("INSERT INTO category VALUES (?, ?)", ((number, f"Category {number}") for number in range(groups)))
+    db.commit()
+    db.close()
+    if rows > 0:
+        write(os.path.join(path, "items", "item.md"), """---
+title: {{ page.generator.row.title }}
+layout: layout0
+generator:
+    from: mysql
+    db: bench
+    host: localhost
+    port: 3306
+    username: bench
+    password: bench
+    table: item
+    related:
+        -
+            table: tag
+            where: itemId='{{ page.generator.row.id }}'
+        -
+            table: category
+            where: groupId='{{ page.generator.row.groupId }}'
+            limit: 1
+permalink: items/{{ page.generator.row.id }}
+---
+# {{ page.title }} in {{ page.generator.related.category[0].name }}
+
+{{ page.generator.row.body }}
+
+{% for tag in page.generator.related.tag %}* {{ tag.name }}
+{% endfor %}
+""")
+
+
+def generate_site(path, db_path, pages=100, posts=100, rows=100, related=3, layout_depth=2, includes=2, seed=1):
+    """Write a site to `path` and the tables its mysql generator reads to the SQLite file `db_path`."""
+    rng = random.Random(seed)
+    write(os.path.join(path, "_config.yaml"), "url: https://example.com\ntitle: Benchmark\nsitemap: sitemap.xml\nlinks:\n    - /\n    - /blog/\n    - /about/\n")
+    write(os.path.join(path, "index.md"), "---\ntitle: Home\nlayout: layout0\n---\n# {{ site.title }}\n")
+    write(os.path.join(path, "_static", "css", "site.css"), "body { margin: 0; }\n")
+    write_layouts(path, max(1, layout_depth), includes)
+    write_pages(path, rng, pages)
+    write_posts(path, rng, posts)
+    write_items(path, db_path, rng, rows, related)
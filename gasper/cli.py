@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import os
+import subprocess
+import sys
+
+
+def report_import_time(stderr):
+    """Print import time per top-level package from `python -X importtime` output and pass the other lines through."""
+    packages = {}
+    total = 0
+    count = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            print(line, file=sys.stderr)
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        package = parts[2].strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(parts[0])
+        total += int(parts[0])
+        count += 1
+
+    from .util import colorify
+    prefix = colorify.gray("[ IMPORT ]")
+    print(f"{prefix} {total / 1000:.1f} ms in {count} modules")
+    for name, microseconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:15]:
+        print(f"{prefix} {microseconds / 1000:9.1f} ms  {name}")
+
+
+def main():
+    if "--import-time" in sys.argv and not os.environ.get("GASPER_IMPORT_TIME"):
+        # run again under -X importtime, which times every import including backends loaded during the build
+        env = dict(os.environ, GASPER_IMPORT_TIME="1")
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", "from gasper.cli import main; main()", *sys.argv[1:]], env=env, stderr=subprocess.PIPE, text=True)
+        report_import_time(process.stderr)
+        sys.exit(process.returncode)
+
+    if "--client" in sys.argv:
+        from .core.daemon import run_client
+        status = run_client(os.path.join(".gasper-cache", "daemon.sock"), sys.argv)
+        if status is not None:
+            sys.exit(status)
+
+    from .gasper import main as build
+    build()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import hashlib
+import os
+import pickle
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+
+
+FRONTMATTER_PATTERN = re.compile(r'---\n(.*?)\n---', re.DOTALL)
+
+
+class TemplateCache:
+    """LRU of compiled Jinja templates keyed by source path, part of the file and content hash."""
+
+    def __init__(self, env, size=1024):
+        self.env = env
+        self.size = size
+        self.templates = OrderedDict()
+
+    def get(self, source, path=None, part="body"):
+        digest = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        key = (path, part, digest)
+        template = self.templates.get(key)
+        if template is not None:
+            self.templates.move_to_end(key)
+            return template
+
+        # one bytecode cache bucket per file part (a page's front matter and body are compiled separately), and per
+        # content for templates that have no file
+        name = f"{path}#{part}" if path is not None else f"<string>#{digest}"
+        template = self.compile(source, path, name)
+        self.templates[key] = template
+        if len(self.templates) > self.size:
+            self.templates.popitem(last=False)
+        return template
+
+    def compile(self, source, path, name):
+        bcc = self.env.bytecode_cache
+        if bcc is None:
+            return self.env.from_string(source)
+
+        # same steps as jinja2.loaders.BaseLoader.load, for templates that have no loader
+        bucket = bcc.get_bucket(self.env, name, path, source)
+        code = bucket.code
+        if code is None:
+            code = self.env.compile(source, path or "<string>", path)
+            bucket.code = code
+            bcc.set_bucket(bucket)
+        return self.env.template_class.from_code(self.env, code, self.env.make_globals(None), None)
+
+    def clear(self):
+        self.templates.clear()
+
+
+class SourceCache:
+    """Source files read once and split into front matter and body, invalidated by mtime and size."""
+
+    def __init__(self):
+        self.sources = {}
+
+    def get(self, path):
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        entry = self.sources.get(path)
+        if entry is not None and entry[0] == version:
+            return entry[1], entry[2]
+
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        matter = None
+        body = content
+        m = FRONTMATTER_PATTERN.search(content)
+        if m:
+            matter = m.group(1)
+            body = FRONTMATTER_PATTERN.sub("", content)
+        self.sources[path] = (version, matter, body)
+        return matter, body
+
+    def clear(self):
+        self.sources.clear()
+
+
+def copy_rows(rows):
+    # every caller gets rows of its own, so changing one doesn't change what the next query with the same key returns
+    if isinstance(rows, list):
+        return [dict(row) if isinstance(row, dict) else row for row in rows]
+    return rows
+
+
+class QueryCache:
+    """Query results kept for the build, and in memory and an SQLite file across builds when a query asks for it.
+
+    The in-memory layer is an LRU of at most `size` results; persistent ones dropped from it are read back from SQLite.
+    """
+
+    def __init__(self, path, size=1024):
+        self.path = path
+        self.size = size
+        self.results = OrderedDict()
+        self.db = None
+
+    def connect(self):
+        if self.db is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self.db = sqlite3.connect(self.path, timeout=30)
+            self.db.execute("CREATE TABLE IF NOT EXISTS queries (key TEXT PRIMARY KEY, version TEXT, created REAL, rows BLOB)")
+        return self.db
+
+    def is_valid(self, created, entry_version, ttl, version):
+        if ttl is not None and time.time() - created > ttl:
+            return False
+        return version is None or entry_version == version
+
+    def get(self, key, ttl=None, version=None):
+        entry = self.results.get(key)
+        if entry is not None and self.is_valid(entry[2], entry[1], ttl, version):
+            self.results.move_to_end(key)
+            return copy_rows(entry[0])
+        if ttl is None and version is None:
+            return None
+
+        entry = self.connect().execute("SELECT version, created, rows FROM queries WHERE key = ?", (key,)).fetchone()
+        if entry is None:
+            return None
+        if not self.is_valid(entry[1], entry[0], ttl, version):
+            return None
+        rows = pickle.loads(entry[2])
+        self.remember(key, (rows, entry[0], entry[1], ttl))
+        return copy_rows(rows)
+
+    def remember(self, key, entry):
+        self.results[key] = entry
+        self.results.move_to_end(key)
+        if len(self.results) > self.size:
+            self.results.popitem(last=False)
+
+    def set(self, key, rows, ttl=None, version=None):
+        self.remember(key, (copy_rows(rows), version, time.time(), ttl))
+        if ttl is None and version is None:
+            return
+        db = self.connect()
+        db.execute("REPLACE INTO queries (key, version, created, rows) VALUES (?, ?, ?, ?)", (key, version, time.time(), pickle.dumps(rows)))
+        db.commit()
+
+    def clear(self):
+        # results with a ttl or version are checked again when read, so they can outlive the build; a resident daemon
+        # clears after every build, so the ones whose ttl has run out go instead of waiting to be read again
+        now = time.time()
+        self.results = OrderedDict(
+            (key, (rows, version, created, ttl)) for key, (rows, version, created, ttl) in self.results.items()
+            if (ttl is not None and now - created <= ttl) or (ttl is None and version is not None)
+        )
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
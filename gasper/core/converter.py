@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from markdown import Markdown
+
+
+MEMO_SIZE = 1024
+
+local = threading.local()
+memo = OrderedDict()
+lock = threading.Lock()
+
+
+def get_converter():
+    converter = getattr(local, "converter", None)
+    if converter is None:
+        converter = Markdown()
+        local.converter = converter
+    return converter
+
+
+def markdown(text):
+    """Drop-in for markdown.markdown that reuses one converter per thread and memoises the output."""
+    key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    with lock:
+        html = memo.get(key)
+        if html is not None:
+            memo.move_to_end(key)
+            return html
+
+    html = get_converter().reset().convert(text)
+    with lock:
+        memo[key] = html
+        if len(memo) > MEMO_SIZE:
+            memo.popitem(last=False)
+    return html
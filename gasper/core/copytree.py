@@ -39,4 +39,44 @@ def copytree(src, dst, symlinks=False, ignore=None):
         else:
             errors.extend((src, dst, str(why)))
     if errors:
-        raise Error(errors)
\ No newline at end of file
+        raise Error(errors)
+
+def sync_file(src, dst):
+    """Copy `src` to `dst` unless `dst` already has the same size and mtime; returns True when copied."""
+    src_stat = os.stat(src)
+    try:
+        dst_stat = os.stat(dst)
+        if dst_stat.st_size == src_stat.st_size and dst_stat.st_mtime_ns == src_stat.st_mtime_ns:
+            return False
+    except FileNotFoundError:
+        pass
+
+    directory = os.path.dirname(dst)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    # copyfile uses sendfile/fcopyfile where the platform supports it
+    copyfile(src, dst)
+    copystat(src, dst)
+    return True
+
+
+def sync_tree(src, dst):
+    """Make `dst` a copy of `src`, copying only changed files and removing the ones that no longer exist."""
+    copied = 0
+    found = set()
+    for subdir, dirs, files in os.walk(src):
+        relative = os.path.relpath(subdir, src)
+        for name in files:
+            path = os.path.normpath(os.path.join(relative, name))
+            found.add(path)
+            if sync_file(os.path.join(src, path), os.path.join(dst, path)):
+                copied += 1
+
+    for subdir, dirs, files in os.walk(dst, topdown=False):
+        relative = os.path.relpath(subdir, dst)
+        for name in files:
+            if os.path.normpath(os.path.join(relative, name)) not in found:
+                os.remove(os.path.join(subdir, name))
+        if subdir != dst and not os.listdir(subdir):
+            os.rmdir(subdir)
+    return copied
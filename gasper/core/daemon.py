@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import contextlib
+import json
+import os
+import socket
+import sys
+
+from ..util import colorify
+
+
+class SocketOutput:
+    """File-like object that forwards a build's output to the client as JSON lines."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def write(self, s):
+        if s:
+            try:
+                self.conn.sendall((json.dumps({ "out": s }) + "\n").encode("utf-8"))
+            except OSError:
+                pass
+        return len(s)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class Daemon:
+    """Keeps one warm Gasper and runs the builds that clients send over a Unix socket, one at a time."""
+
+    def __init__(self, gasper, path):
+        self.gasper = gasper
+        self.path = path
+
+    def listen(self):
+        if not hasattr(socket, "AF_UNIX"):
+            raise Exception("the daemon needs Unix domain sockets, which this platform does not have")
+        if os.path.exists(self.path):
+            if is_running(self.path):
+                raise Exception(f"a daemon is already listening on {self.path}")
+            os.remove(self.path)
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        server.listen(16)
+        return server
+
+    def serve(self):
+        server = self.listen()
+        print(f"{colorify.green("[   OK   ]")} daemon listening on {self.path}")
+        try:
+            while True:
+                conn, _ = server.accept()
+                with conn:
+                    self.handle(conn)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def handle(self, conn):
+        try:
+            request = json.loads(conn.makefile("r", encoding="utf-8").readline())
+        except ValueError:
+            return
+        output = SocketOutput(conn)
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            if os.path.abspath(request.get("cwd", "")) != os.getcwd():
+                print(f"the daemon builds into {os.getcwd()}, run the client from there")
+                status = 1
+            else:
+                status = self.gasper.run_request(request["argv"])
+        try:
+            conn.sendall((json.dumps({ "status": status }) + "\n").encode("utf-8"))
+        except OSError:
+            pass
+
+
+def is_running(path):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+        return True
+    except OSError:
+        return False
+
+
+def run_client(path, argv):
+    """Send a build to the daemon on `path` and print its output; None when no daemon is running."""
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except OSError:
+        client.close()
+        return None
+
+    with client:
+        client.sendall((json.dumps({ "argv": argv, "cwd": os.getcwd() }) + "\n").encode("utf-8"))
+        for line in client.makefile("r", encoding="utf-8"):
+            message = json.loads(line)
+            if "out" in message:
+                sys.stdout.write(message["out"])
+                sys.stdout.flush()
+            elif "status" in message:
+                return message["status"]
+    return 1
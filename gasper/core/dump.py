@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import filecmp
+import gzip
+import json
+import os
+
+
+class CompressedFile:
+    """A file written together with its pre-compressed .gz / .br copies; files that end up unchanged are not replaced."""
+
+    def __init__(self, path, compress=()):
+        self.path = path
+        self.files = [(path, open(path + ".tmp", "wb"))]
+        self.compressor = None
+        try:
+            self.open_compressed(compress)
+        except BaseException:
+            self.abort()
+            raise
+
+    def open_compressed(self, compress):
+        path = self.path
+        for method in compress:
+            if method == "gzip":
+                # mtime=0 so unchanged content gives an identical .gz
+                self.files.append((path + ".gz", gzip.GzipFile(path + ".gz.tmp", "wb", mtime=0)))
+            elif method == "brotli":
+                try:
+                    import brotli
+                except ImportError:
+                    raise Exception("dumpTo compress: brotli needs the brotli package (pip install brotli)")
+                self.compressor = brotli.Compressor()
+                self.files.append((path + ".br", open(path + ".br.tmp", "wb")))
+            else:
+                raise Exception(f"dumpTo compress: unknown method '{method}'")
+
+    def write(self, s):
+        data = s.encode("utf-8")
+        for path, f in self.files:
+            if path.endswith(".br"):
+                f.write(self.compressor.process(data))
+            else:
+                f.write(data)
+
+    def close(self):
+        try:
+            for path, f in self.files:
+                if path.endswith(".br"):
+                    f.write(self.compressor.finish())
+                f.close()
+        except BaseException:
+            self.abort()
+            raise
+        paths = []
+        for path, f in self.files:
+            if os.path.exists(path) and filecmp.cmp(path + ".tmp", path, shallow=False):
+                os.remove(path + ".tmp")
+            else:
+                os.replace(path + ".tmp", path)
+            paths.append(path)
+        return paths
+
+    def abort(self):
+        """Close and remove the .tmp files, leaving the previous outputs as they were."""
+        for path, f in self.files:
+            try:
+                f.close()
+            except Exception:
+                pass
+            if os.path.exists(path + ".tmp"):
+                os.remove(path + ".tmp")
+
+
+class Dump:
+    """Writes generator rows as JSON while they arrive, optionally split into shards of `shard` rows listed in a manifest.
+
+    `layout: columns` stores the column names once and each row as a list of values.
+    """
+
+    def __init__(self, path, shard=None, compress=(), layout="rows"):
+        if isinstance(compress, str):
+            compress = [compress]
+        if layout not in ("rows", "columns"):
+            raise Exception(f"dumpTo layout: unknown layout '{layout}'")
+        self.path = path
+        self.shard = int(shard) if shard else None
+        self.compress = compress or ()
+        self.layout = layout
+        self.columns = None
+        self.count = 0
+        self.shards = []
+        self.outputs = []
+        self.file = None
+        self.rows_in_file = 0
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def shard_path(self, number):
+        name, extension = os.path.splitext(self.path)
+        return f"{name}-{number}{extension}"
+
+    def open(self, path):
+        self.file = CompressedFile(path, self.compress)
+        self.rows_in_file = 0
+        self.file.write("{")
+        if self.layout == "columns":
+            self.file.write(f"\"columns\": {json.dumps(self.columns or [])}, ")
+        self.file.write("\"rows\": [")
+
+    def end_rows(self):
+        self.file.write("]")
+
+    def write(self, rows):
+        for row in rows:
+            if self.columns is None:
+                self.columns = list(row.keys())
+            if self.file is None:
+                if self.shard is not None:
+                    self.shards.append(os.path.basename(self.shard_path(len(self.shards) + 1)))
+                    self.open(self.shard_path(len(self.shards)))
+                else:
+                    self.open(self.path)
+            elif self.rows_in_file > 0:
+                self.file.write(", ")
+            if self.layout == "columns":
+                self.file.write(json.dumps([row.get(column) for column in self.columns]))
+            else:
+                self.file.write(json.dumps(row))
+            self.rows_in_file += 1
+            self.count += 1
+            if self.shard is not None and self.rows_in_file >= self.shard:
+                self.end_rows()
+                self.file.write("}")
+                self.outputs.extend(self.file.close())
+                self.file = None
+
+    def close(self, related={}):
+        """Finish the files and return every path written."""
+        if self.shard is None:
+            if self.file is None:
+                self.open(self.path)
+            self.end_rows()
+            self.file.write(f", \"related\": {json.dumps(related)}}}")
+            self.outputs.extend(self.file.close())
+            return self.outputs
+
+        if self.file is not None:
+            self.end_rows()
+            self.file.write("}")
+            self.outputs.extend(self.file.close())
+            self.file = None
+        self.remove_shards(len(self.shards) + 1)
+
+        manifest = CompressedFile(self.path, self.compress)
+        data = { "count": self.count, "shard": self.shard, "layout": self.layout, "shards": self.shards, "related": related }
+        if self.layout == "columns":
+            data["columns"] = self.columns or []
+        try:
+            manifest.write(json.dumps(data))
+        except BaseException:
+            manifest.abort()
+            raise
+        self.outputs.extend(manifest.close())
+        return self.outputs
+
+    def abort(self):
+        if self.file is not None:
+            self.file.abort()
+            self.file = None
+
+    def remove_shards(self, start):
+        number = start
+        while os.path.exists(self.shard_path(number)):
+            for suffix in ("", ".gz", ".br"):
+                if os.path.exists(self.shard_path(number) + suffix):
+                    os.remove(self.shard_path(number) + suffix)
+            number += 1
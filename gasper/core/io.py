@@ -1,9 +1,5 @@
 import time
 import os, sys
-from watchdog.observers import Observer
-import http.server
-import socketserver
-import webbrowser
 import threading
 import shutil
 
@@ -11,6 +7,7 @@ from ..util import colorify
 
 
 def watch_directory(directory, event_handler):
+    from watchdog.observers import Observer
     observer = Observer()
     observer.schedule(event_handler, directory, recursive=True)
     observer.start()
@@ -31,6 +28,9 @@ class MyHTTPServer(threading.Thread):
         self.server = None
 
     def run(self):
+        import http.server
+        import socketserver
+        import webbrowser
         directory = self.directory
         class Handler(http.server.SimpleHTTPRequestHandler):
             def __init__(self, *args, **kwargs):
@@ -57,5 +57,31 @@ def clean_directory(directory, exceptions=[]):
                 os.remove(item_path)
 
 
+def sweep_directory(directory, keep, exceptions=[]):
+    """Remove the files under `directory` that are not in `keep`, and the directories left empty."""
+    keep = { os.path.normpath(path) for path in keep }
+    for subdir, dirs, files in os.walk(directory, topdown=False):
+        relative = os.path.relpath(subdir, directory)
+        if relative != "." and relative.split(os.sep)[0] in exceptions:
+            continue
+        for name in files:
+            if relative == "." and name in exceptions:
+                continue
+            path = os.path.normpath(os.path.join(subdir, name))
+            if path not in keep:
+                os.remove(path)
+        if relative != "." and not os.listdir(subdir):
+            os.rmdir(subdir)
+
+
 def path_join(*args):
     return os.path.join(*args).replace("\\", "/")
+
+
+def remove_file(path, root):
+    if os.path.isfile(path):
+        os.remove(path)
+    directory = os.path.dirname(path)
+    while directory and os.path.abspath(directory) != os.path.abspath(root) and os.path.isdir(directory) and not os.listdir(directory):
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
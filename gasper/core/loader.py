@@ -1,6 +1,18 @@
 from jinja2 import Environment, BaseLoader, TemplateNotFound
 import os
-from markdown import markdown
+from .converter import markdown
+
+
+class GasperEnvironment(Environment):
+    def get_template(self, name, parent=None, globals=None):
+        template = super().get_template(name, parent, globals)
+        self.loader.parent.track_file(template.filename)
+        return template
+
+    def select_template(self, names, parent=None, globals=None):
+        template = super().select_template(names, parent, globals)
+        self.loader.parent.track_file(template.filename)
+        return template
 
 
 class GasperLoader(BaseLoader):
@@ -16,8 +28,13 @@ class GasperLoader(BaseLoader):
         mtime = os.path.getmtime(path)
         with open(path, 'r', encoding='utf-8') as f:
             source = f.read()
-        matter = self.parent.global_matter
-        source = self.parent.env.from_string(source).render(page=matter, content=None, site=self.config)
+        if self.config.get("prerender_includes", False):
+            # rendered against the current page, so the compiled template can not be reused
+            matter = self.parent.global_matter
+            source = self.parent.templates.get(source, path).render(page=matter, content=None, site=self.config)
+            if path.endswith(".md") or path.endswith(".markdown"):
+                source = markdown(source)
+            return source, path, lambda: False
         if path.endswith(".md") or path.endswith(".markdown"):
-            source = markdown(source)
+            source = "{% filter markdown %}" + source + "{% endfilter %}"
         return source, path, lambda: mtime == os.path.getmtime(path)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import hashlib
+import json
+import os
+
+from . import io
+
+
+MANIFEST_VERSION = 1
+# recorded instead of a key when the whole config was read (iterated, listed or counted)
+WHOLE_CONFIG = "*"
+
+
+def hash_bytes(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def hash_value(value):
+    return hash_bytes(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+
+
+def hash_config(config, name):
+    if name == WHOLE_CONFIG:
+        return hash_value(dict(dict.items(config)))
+    return hash_value(dict.get(config, name))
+
+
+class Tracker:
+    """Files and `_config.yaml` keys read while producing a single output."""
+
+    def __init__(self, parent=None):
+        self.files = set()
+        self.config = set()
+        if parent is not None:
+            self.files.update(parent.files)
+            self.config.update(parent.config)
+
+
+class TrackedConfig(dict):
+    """Site config that reports every key read to the active tracker."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.accessed = None
+
+    def access(self, key):
+        if self.accessed is not None:
+            self.accessed.add(key)
+
+    def __getitem__(self, key):
+        self.access(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.access(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self.access(key)
+        return super().__contains__(key)
+
+    def __iter__(self):
+        self.access(WHOLE_CONFIG)
+        return super().__iter__()
+
+    def __len__(self):
+        self.access(WHOLE_CONFIG)
+        return super().__len__()
+
+    def keys(self):
+        self.access(WHOLE_CONFIG)
+        return super().keys()
+
+    def values(self):
+        self.access(WHOLE_CONFIG)
+        return super().values()
+
+    def items(self):
+        self.access(WHOLE_CONFIG)
+        return super().items()
+
+
+class Manifest:
+    """Per-output dependency graph with content hashes, persisted between builds."""
+
+    def __init__(self, path):
+        self.path = path
+        self.outputs = {}
+        self.produced = set()
+        self.hashes = {}
+        self.changes = {}
+        # False until there is a manifest from an earlier build, so the outputs that build left are known
+        self.loaded = False
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self.outputs = data.get("outputs", {})
+            self.loaded = True
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({ "version": MANIFEST_VERSION, "outputs": self.outputs }, f)
+        self.loaded = True
+
+    def begin(self):
+        self.produced = set()
+        self.hashes = {}
+        self.changes = {}
+
+    def file_hash(self, path):
+        """The hash of a file's content, of a directory's listing, or None for a path that doesn't exist."""
+        if path not in self.hashes:
+            try:
+                if os.path.isdir(path):
+                    self.hashes[path] = hash_value(sorted(os.listdir(path)))
+                else:
+                    with open(path, "rb") as f:
+                        self.hashes[path] = hash_bytes(f.read())
+            except OSError:
+                self.hashes[path] = None
+        return self.hashes[path]
+
+    def is_fresh(self, output, src, key, config):
+        record = self.outputs.get(output)
+        if record is None or record["src"] != src or record["key"] != key:
+            return False
+        if not os.path.exists(output):
+            return False
+        for path, digest in record["files"].items():
+            if self.file_hash(path) != digest:
+                return False
+        for name, digest in record["config"].items():
+            if hash_config(config, name) != digest:
+                return False
+        return True
+
+    def keep(self, output):
+        self.produced.add(output)
+        self.changes[output] = None
+
+    def record(self, output, src, key, tracker, config):
+        self.outputs[output] = {
+            "src": src,
+            "key": key,
+            "files": { path: self.file_hash(path) for path in sorted(tracker.files) },
+            "config": { name: hash_config(config, name) for name in sorted(tracker.config) }
+        }
+        self.produced.add(output)
+        self.changes[output] = self.outputs[output]
+
+    def take(self):
+        changes = self.changes
+        self.changes = {}
+        return changes
+
+    def merge(self, changes):
+        for output, record in changes.items():
+            if record is not None:
+                self.outputs[output] = record
+            self.produced.add(output)
+
+    def stale(self, sources=None):
+        stale = []
+        for output, record in self.outputs.items():
+            if output in self.produced:
+                continue
+            if sources is None or os.path.abspath(record["src"]) in sources:
+                stale.append(output)
+        return stale
+
+    def remove_stale(self, root, sources=None):
+        removed = self.stale(sources)
+        for output in removed:
+            io.remove_file(output, root)
+            del self.outputs[output]
+        return removed
+
+    def dependents(self, paths):
+        paths = [os.path.abspath(path) for path in paths]
+        sources = set()
+        for record in self.outputs.values():
+            for file in record["files"]:
+                file = os.path.abspath(file)
+                if any(path == file or path.startswith(file + os.sep) for path in paths):
+                    sources.add(os.path.abspath(record["src"]))
+                    break
+        return sources
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class Profiler:
+    """Timed spans and counters for a build, written out as a Chrome trace."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.events = []
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+
+    def span(self, category, name, **args):
+        if not self.enabled:
+            return nullcontext()
+        return self.record(category, name, args)
+
+    def stage(self, name, **args):
+        return self.span("stage", name, **args)
+
+    def page(self, output):
+        return self.span("page", output)
+
+    def query(self, sql):
+        self.count("queries")
+        return self.span("query", " ".join(sql.split()))
+
+    @contextmanager
+    def record(self, category, name, args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                self.events.append({
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": start * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": args
+                })
+
+    def count(self, name, value=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def take(self):
+        """Events and counters recorded since the last call, for sending back from a worker."""
+        with self.lock:
+            events, counters = self.events, self.counters
+            self.events, self.counters = [], {}
+        return events, counters
+
+    def merge(self, data):
+        events, counters = data
+        with self.lock:
+            self.events.extend(events)
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def totals(self, category, key=lambda event: event["name"]):
+        totals = {}
+        for event in self.events:
+            if event["cat"] != category:
+                continue
+            total = totals.setdefault(key(event), [0, 0])
+            total[0] += event["dur"] / 1e6
+            total[1] += 1
+        return sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+
+    def summary(self, top=10):
+        return {
+            "wall": time.perf_counter() - self.started,
+            "counters": dict(self.counters),
+            "stages": { name: { "seconds": seconds, "count": count } for name, (seconds, count) in self.totals("stage") },
+            "pages": [{ "output": name, "seconds": seconds } for name, (seconds, _) in self.totals("page")[:top]],
+            "templates": [{ "template": name, "seconds": seconds, "count": count } for name, (seconds, count) in self.totals("stage", self.template_key) if name is not None][:top],
+            "queries": [{ "sql": name, "seconds": seconds, "count": count } for name, (seconds, count) in self.totals("query")[:top]],
+            "requests": [{ "url": name, "seconds": seconds, "count": count } for name, (seconds, count) in self.totals("request")[:top]]
+        }
+
+    def template_key(self, event):
+        if event["name"] in ("render", "layout"):
+            return event["args"].get("template")
+        return None
+
+    def report(self, print_line, top=10):
+        summary = self.summary(top)
+        counters = summary["counters"]
+        print_line(f"{summary["wall"]:.3f}s, {counters.get("pages", 0)} pages, {counters.get("queries", 0)} queries, {counters.get("bytes", 0)} bytes written")
+        print_line("stages:")
+        for name, total in summary["stages"].items():
+            print_line(f"  {name:<12} {total["seconds"]:9.3f}s {total["count"]:8}")
+        print_line("slowest pages:")
+        for page in summary["pages"]:
+            print_line(f"  {page["seconds"]:9.3f}s  {page["output"]}")
+        print_line("slowest templates:")
+        for template in summary["templates"]:
+            print_line(f"  {template["seconds"]:9.3f}s {template["count"]:8}  {template["template"]}")
+        print_line("slowest queries:")
+        for query in summary["queries"]:
+            sql = query["sql"] if len(query["sql"]) <= 100 else query["sql"][:97] + "..."
+            print_line(f"  {query["seconds"]:9.3f}s {query["count"]:8}  {sql}")
+        if len(summary["requests"]) > 0:
+            print_line("slowest requests:")
+            for request in summary["requests"]:
+                print_line(f"  {request["seconds"]:9.3f}s {request["count"]:8}  {request["url"]}")
+
+    def save(self, path, top=10):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({ "traceEvents": self.events, "displayTimeUnit": "ms", "summary": self.summary(top) }, f, default=str)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import http.server
+import mimetypes
+import os
+import threading
+import urllib.parse
+
+from ..util import colorify
+
+
+LIVE_RELOAD_PATH = "/__gasper/livereload"
+LIVE_RELOAD_SCRIPT = f"<script>new EventSource(\"{LIVE_RELOAD_PATH}\").onmessage = function () {{ location.reload(); }};</script>"
+
+
+def inject_live_reload(html):
+    index = html.rfind("</body>")
+    if index == -1:
+        return html + LIVE_RELOAD_SCRIPT
+    return html[:index] + LIVE_RELOAD_SCRIPT + html[index:]
+
+
+def is_inside(path, directory):
+    path = os.path.realpath(path)
+    directory = os.path.realpath(directory)
+    return path == directory or path.startswith(directory + os.sep)
+
+
+class DevServer(threading.Thread):
+    """Serves the route table of a Gasper in serve mode, rendering pages when they are first requested."""
+
+    def __init__(self, gasper, port=8080):
+        super().__init__(daemon=True)
+        self.gasper = gasper
+        self.port = port
+        self.version = 0
+        self.changed = threading.Condition()
+        self.server = None
+
+    def notify(self):
+        with self.changed:
+            self.version += 1
+            self.changed.notify_all()
+
+    def resolve(self, url):
+        """(kind, value) for a request path: a rendered page, a file to send, a redirect or None."""
+        path = urllib.parse.unquote(urllib.parse.urlsplit(url).path)
+        output = "dist" + path
+        if output.endswith("/"):
+            output += "index.html"
+        route = self.gasper.routes.get(output)
+        if route is not None:
+            if route["matter"] is None:
+                return "file", route["src"]
+            return "page", output
+        if self.gasper.routes.get(output + "/index.html") is not None:
+            return "redirect", path + "/"
+
+        static = self.gasper.path + "/_static"
+        if path.startswith("/static/") and is_inside(static + path[len("/static"):], static) and os.path.isfile(static + path[len("/static"):]):
+            return "file", static + path[len("/static"):]
+        # dumpTo output and anything else that is only written to disk
+        if is_inside(output, "dist") and os.path.isfile(output):
+            return "file", output
+        return None, None
+
+    def run(self):
+        dev_server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == LIVE_RELOAD_PATH and self.command == "GET":
+                    return self.live_reload()
+                try:
+                    kind, value = dev_server.resolve(self.path)
+                    if kind == "page":
+                        self.send(inject_live_reload(dev_server.gasper.render_route(value)).encode("utf-8"), "text/html; charset=utf-8")
+                    elif kind == "file":
+                        with open(value, "rb") as f:
+                            data = f.read()
+                        content_type = mimetypes.guess_type(value)[0] or "application/octet-stream"
+                        if content_type == "text/html":
+                            data = inject_live_reload(data.decode("utf-8")).encode("utf-8")
+                        self.send(data, content_type)
+                    elif kind == "redirect":
+                        self.send_response(301)
+                        self.send_header("Location", value)
+                        self.end_headers()
+                    else:
+                        self.send(f"{self.path} not found".encode("utf-8"), "text/plain; charset=utf-8", 404)
+                except Exception as e:
+                    dev_server.gasper.error_print(e)
+                    self.send(f"{type(e).__name__}: {e}".encode("utf-8"), "text/plain; charset=utf-8", 500)
+
+            def send(self, data, content_type, status=200):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(data)
+
+            do_HEAD = do_GET
+
+            def live_reload(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                version = dev_server.version
+                try:
+                    while True:
+                        with dev_server.changed:
+                            dev_server.changed.wait_for(lambda: dev_server.version != version, timeout=15)
+                        if dev_server.version != version:
+                            version = dev_server.version
+                            self.wfile.write(b"data: reload\n\n")
+                        else:
+                            self.wfile.write(b": ping\n\n")
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("", self.port), Handler)
+        self.server.daemon_threads = True
+        print(f"{colorify.yellow("[ SERVER ]")} Serving on http://localhost:{self.port}/ ...")
+        self.server.serve_forever()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
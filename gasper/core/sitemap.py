@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import os
+
+from . import io
+
+
+# the sitemap protocol's limits for one file, uncompressed
+URLS_PER_SITEMAP = 50000
+BYTES_PER_SITEMAP = 50 * 1024 * 1024
+
+URLSET_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset
+    xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+    xsi:schemaLocation="http://www.sitemaps.org/schemas/sitemap/0.9
+            http://www.sitemaps.org/schemas/sitemap/0.9/sitemap.xsd">
+            """
+
+URLSET_FOOTER = "</urlset>"
+
+INDEX_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+"""
+
+
+def get_priority(url, base_url):
+    parts = url.split(base_url)
+    parts = parts[-1][1:].split("/")
+    if len(parts) <= 1:
+        return "1.0"
+    elif len(parts) <= 2:
+        return "0.8"
+    return "0.7"
+
+
+def format_url(url, lastmod, base_url):
+    s = f"<url>\n  <loc>{url}</loc>\n"
+    if lastmod is not None:
+        s += f"  <lastmod>{lastmod}</lastmod>\n"
+    return s + f"  <priority>{get_priority(url, base_url)}</priority>\n</url>\n"
+
+
+def split_urls(entries, base_url):
+    """The formatted <url> elements in groups that each fit one sitemap: at most 50,000 URLs and 50MB."""
+    groups = [[]]
+    size = len(URLSET_HEADER.encode("utf-8")) + len(URLSET_FOOTER)
+    for url, lastmod in entries:
+        element = format_url(url, lastmod, base_url)
+        length = len(element.encode("utf-8"))
+        if len(groups[-1]) > 0 and (len(groups[-1]) >= URLS_PER_SITEMAP or size + length > BYTES_PER_SITEMAP):
+            groups.append([])
+            size = len(URLSET_HEADER.encode("utf-8")) + len(URLSET_FOOTER)
+        groups[-1].append(element)
+        size += length
+    return groups
+
+
+def write_urlset(path, urls):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(URLSET_HEADER)
+        f.writelines(urls)
+        f.write(URLSET_FOOTER)
+
+
+def remove_children(path, name, extension, start):
+    number = start
+    while os.path.exists(io.path_join(os.path.dirname(path), f"{name}-{number}{extension}")):
+        os.remove(io.path_join(os.path.dirname(path), f"{name}-{number}{extension}"))
+        number += 1
+
+
+def write_sitemap(path, entries, base_url):
+    """Write `entries` (url, lastmod) to `path`, splitting into a sitemap index when they don't fit one sitemap."""
+    name, extension = os.path.splitext(os.path.basename(path))
+    groups = split_urls(entries, base_url)
+    remove_children(path, name, extension, 1 if len(groups) == 1 else len(groups) + 1)
+    if len(groups) == 1:
+        write_urlset(path, groups[0])
+        return [path]
+
+    relative_dir = os.path.dirname(path).replace("\\", "/").split("/", 1)[1:]
+    paths = [path]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(INDEX_HEADER)
+        for number, urls in enumerate(groups, start=1):
+            child_name = f"{name}-{number}{extension}"
+            child_path = io.path_join(os.path.dirname(path), child_name)
+            write_urlset(child_path, urls)
+            paths.append(child_path)
+            f.write("<sitemap>\n")
+            f.write(f"  <loc>{base_url}/{"/".join(relative_dir + [child_name])}</loc>\n")
+            f.write("</sitemap>\n")
+        f.write("</sitemapindex>")
+    return paths
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import yaml
+
+
+class Expression:
+    """A front matter value with Jinja in it, compiled once and rendered per row."""
+
+    def __init__(self, template, scalar):
+        self.template = template
+        # a value that is a single {{ }} may render to a number or boolean, as it did when parsed as YAML
+        self.scalar = scalar
+
+    def render(self, context):
+        s = self.template.render(context)
+        if not self.scalar:
+            return s
+        try:
+            value = yaml.safe_load(s)
+        except yaml.YAMLError:
+            return s
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        return s
+
+
+class ValueExpression(Expression):
+    """A front matter value with Jinja in it; a plain (unquoted) one is read as YAML once rendered, as it was when the
+    whole front matter was rendered before being parsed."""
+
+    def __init__(self, template, scalar, newline=False):
+        super().__init__(template, scalar)
+        # Jinja drops a template's last newline, which a block (|) value keeps
+        self.newline = newline
+
+    def render(self, context):
+        s = self.template.render(context)
+        if self.newline:
+            s += "\n"
+        if not self.scalar:
+            return s
+        try:
+            return yaml.safe_load(s)
+        except yaml.YAMLError:
+            return s
+
+
+class MatterLoader(yaml.SafeLoader):
+    """Parses raw (→→ ←← escaped) front matter, compiling the strings that hold Jinja to ValueExpressions."""
+
+    def __init__(self, stream, templates):
+        super().__init__(stream)
+        self.templates = templates
+
+    def construct_yaml_str(self, node):
+        value = super().construct_yaml_str(node)
+        if "→→" not in value and "{%" not in value:
+            return value
+        return ValueExpression(self.templates.get(value.replace("→→", "{{").replace("←←", "}}")), node.style is None, value.endswith("\n"))
+
+
+MatterLoader.add_constructor("tag:yaml.org,2002:str", MatterLoader.construct_yaml_str)
+
+
+def compile_matter(templates, raw_matter):
+    """Front matter parsed once, to be rendered per generator row with render_spec."""
+    loader = MatterLoader(raw_matter.replace("{{", "→→").replace("}}", "←←"), templates)
+    try:
+        return loader.get_single_data()
+    finally:
+        loader.dispose()
+
+
+def compile_spec(templates, value):
+    """Compile the raw (→→ ←← escaped) strings in `value` to Expressions; everything else is kept as it is."""
+    if isinstance(value, dict):
+        return { key: compile_spec(templates, item) for key, item in value.items() }
+    if isinstance(value, list):
+        return [compile_spec(templates, item) for item in value]
+    if isinstance(value, str) and ("→→" in value or "{%" in value):
+        stripped = value.strip()
+        scalar = stripped.startswith("→→") and stripped.endswith("←←") and stripped.count("→→") == 1
+        return Expression(templates.get(value.replace("→→", "{{").replace("←←", "}}")), scalar)
+    return value
+
+
+def render_spec(spec, context):
+    if isinstance(spec, dict):
+        return { render_spec(key, context): render_spec(item, context) for key, item in spec.items() }
+    if isinstance(spec, list):
+        return [render_spec(item, context) for item in spec]
+    if isinstance(spec, Expression):
+        return spec.render(context)
+    return spec
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import os
+import threading
+
+from ..util import colorify
+
+
+class BuildCancelled(Exception):
+    pass
+
+
+class Watcher:
+    """Coalesces filesystem events and rebuilds the affected pages in the background.
+
+    A watchdog event handler; it only needs `dispatch`, so watchdog is not imported until a watch starts.
+    """
+
+    def __init__(self, gasper, delay=0.3, ignore=[]):
+        self.gasper = gasper
+        self.delay = delay
+        self.ignore = [os.path.abspath(path) for path in ignore]
+        self.lock = threading.Lock()
+        self.flushing = threading.Lock()
+        self.pending = set()
+        self.active = set()
+        self.timer = None
+        self.thread = None
+        self.cancel = threading.Event()
+
+    def is_ignored(self, path):
+        path = os.path.abspath(path)
+        for ignored in self.ignore:
+            if path == ignored or path.startswith(ignored + os.sep):
+                return True
+        return False
+
+    def dispatch(self, event):
+        self.on_any_event(event)
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in ("created", "modified", "deleted", "moved"):
+            return
+        paths = [event.src_path]
+        if event.event_type == "moved":
+            paths.append(event.dest_path)
+        paths = [path for path in paths if not self.is_ignored(path)]
+        if len(paths) == 0:
+            return
+
+        with self.lock:
+            self.pending.update(paths)
+            self.cancel.set()
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        with self.flushing:
+            if self.thread is not None:
+                self.thread.join()
+            with self.lock:
+                self.active.update(self.pending)
+                self.pending = set()
+                if len(self.active) == 0:
+                    return
+                self.cancel = threading.Event()
+                self.thread = threading.Thread(target=self.rebuild, args=(set(self.active), self.cancel), daemon=True)
+                self.thread.start()
+
+    def rebuild(self, paths, cancel):
+        try:
+            self.gasper.rebuild(paths, cancel)
+            self.done(paths)
+        except BuildCancelled:
+            print(f"{colorify.gray("[  TASK  ]")} rebuild cancelled, restarting...")
+        except Exception as e:
+            self.done(paths)
+            self.gasper.error_print(e)
+
+    def done(self, paths):
+        # flush() reads and extends `active` under the lock from the timer thread
+        with self.lock:
+            self.active.difference_update(paths)
+
+    def stop(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+            self.cancel.set()
+        if self.thread is not None:
+            self.thread.join()
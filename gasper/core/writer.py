@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..util import colorify
+
+
+class Progress:
+    """Build counters, shown as a single line that is redrawn in place on a terminal."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.show = False
+        self.drawn = 0
+
+    def start(self, show=True):
+        self.counts = {}
+        self.show = show and sys.stdout.isatty()
+        self.drawn = 0
+
+    def add(self, name, value=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + value
+            self.draw()
+
+    def take(self):
+        with self.lock:
+            counts = self.counts
+            self.counts = {}
+        return counts
+
+    def merge(self, counts):
+        with self.lock:
+            for name, value in counts.items():
+                self.counts[name] = self.counts.get(name, 0) + value
+            self.draw()
+
+    def draw(self, force=False):
+        if not self.show or (not force and time.monotonic() - self.drawn < 0.1):
+            return
+        self.drawn = time.monotonic()
+        sys.stdout.write(f"\r{colorify.gray("[  TASK  ]")} {self.counts.get("rendered", 0) + self.counts.get("fresh", 0)} pages...")
+        sys.stdout.flush()
+
+    def finish(self, print_line):
+        with self.lock:
+            if self.show and self.drawn:
+                sys.stdout.write("\r\033[K")
+            counts = self.counts
+            print_line(f"{counts.get("rendered", 0)} pages rendered, {counts.get("fresh", 0)} up to date; {counts.get("written", 0)} files written, {counts.get("unchanged", 0)} unchanged, {counts.get("copied", 0)} copied")
+
+
+class Writer:
+    """Writes outputs from a thread pool; a file whose content is already the same is not touched, so its mtime is kept."""
+
+    def __init__(self, progress, profiler, pending=256):
+        self.progress = progress
+        self.profiler = profiler
+        self.pending = pending
+        self.directories = set()
+        self.lock = threading.Lock()
+        self.pool = None
+        self.futures = []
+
+    def write(self, path, data):
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor()
+        self.futures.append(self.pool.submit(self.write_file, path, data))
+        # rendered pages wait in memory until written, so don't let them pile up
+        if len(self.futures) > self.pending:
+            self.futures.pop(0).result()
+
+    def makedirs(self, directory):
+        if directory in self.directories:
+            return
+        os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            self.directories.add(directory)
+
+    def write_file(self, path, data):
+        # timed here, on the writer's thread, rather than where the page is handed over
+        with self.profiler.stage("write"):
+            return self.write_data(path, data)
+
+    def write_data(self, path, data):
+        try:
+            if os.path.getsize(path) == len(data):
+                with open(path, "rb") as f:
+                    if f.read() == data:
+                        self.progress.add("unchanged")
+                        return False
+        except OSError:
+            pass
+        self.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(data)
+        self.progress.add("written")
+        return True
+
+    def flush(self):
+        futures = self.futures
+        self.futures = []
+        for future in futures:
+            future.result()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+        self.futures = []
+        self.directories.clear()
@@ -7,37 +7,70 @@ See the file 'LICENSE' for copying permission
 """
 
 import sys, os
-from jinja2 import Environment, BaseLoader
-from markdown import markdown
+from jinja2 import Environment, BaseLoader, FileSystemBytecodeCache
+from .core.converter import markdown
 import pathlib
-import re
 import yaml
 from slugify import slugify
 import json
-from watchdog.events import FileSystemEventHandler
-import requests
 import threading
 import time
-import copy
+import math
+import itertools
+import pickle
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.reduction import ForkingPickler
 
 from .libs.argparse import ArgParse
 from .util import ext, colorify
-from .generator.mysql import generate as mysql_generate
-from .generator.posts import generate as posts_generate
-from .core.loader import GasperLoader
+from .generator.registry import get_backend, close as close_backends
+from .core.loader import GasperLoader, GasperEnvironment
+from .core.manifest import Manifest, Tracker, TrackedConfig, hash_value
+from .core.watcher import BuildCancelled
+from .core.cache import TemplateCache, SourceCache, QueryCache
 from .core import io
-from .core.copytree import copytree
+from .core.copytree import sync_tree, sync_file
+from .core.sitemap import write_sitemap
+from .core.profiler import Profiler
+from .core.writer import Writer, Progress
+from .core.dump import Dump
+from .core.spec import compile_spec, compile_matter, render_spec
 
 
-class Gasper(FileSystemEventHandler):
-    def __init__(self):
+class Gasper:
+    def __init__(self, args=None, path=None):
         yaml.SafeLoader.add_constructor("tag:yaml.org,2002:python/unicode", self.yaml_constructor)
         self.global_matter = {}
-        self.path = None
-        self.args = self.parse_arguments()
+        self.path = path
+        self.tracker = None
+        self.cache_path = ".gasper-cache"
+        self.is_worker = False
+        self.pool = None
+        self.futures = []
+        # rows of the pages being rendered by the pool, written once for the workers to read
+        self.shared_rows = []
+        self.args = args if args is not None else self.parse_arguments()
+        self.profiler = Profiler(self.args.profile)
+        self.progress = Progress()
+        self.writer = Writer(self.progress, self.profiler)
+        self.outputs = set()
+        self.specs = {}
         # self.env = Environment(loader=FileSystemLoader(self.path), autoescape = True)
         self.config = self.load_config()
-        self.env = Environment(loader=GasperLoader(io.path_join(self.path, "_include"), self))
+        bytecode_cache = None
+        if self.args.bytecodecache:
+            os.makedirs(io.path_join(self.cache_path, "jinja"), exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(io.path_join(self.cache_path, "jinja"))
+        self.env = GasperEnvironment(loader=GasperLoader(io.path_join(self.path, "_include"), self), bytecode_cache=bytecode_cache)
+        self.templates = TemplateCache(self.env)
+        self.sources = SourceCache()
+        self.queries = QueryCache(io.path_join(self.cache_path, "queries.db"))
+        # created by the posts backend the first time a page uses it
+        self.posts = None
+        self.verbatim = {}
         self.apply_filters()
         self.allowed_extension = [
             "html",
@@ -47,7 +80,16 @@ class Gasper(FileSystemEventHandler):
             "exe",
             "bin"
         ]
-        self.sitemap = []
+        self.sitemap = {}
+        self.built = False
+        # serve mode: output path -> what is needed to render it, and the pages rendered so far
+        self.routes = None
+        self.rendered = {}
+        self.server = None
+        self.lock = threading.RLock()
+        self.manifest = None
+        if self.args.incremental or self.args.watch:
+            self.manifest = Manifest(io.path_join(self.cache_path, "manifest.json"))
         
         
     def yaml_constructor(self, loader, node):
@@ -61,6 +103,9 @@ class Gasper(FileSystemEventHandler):
         
     def success_print(self, s):
         print(f"{colorify.green("[   OK   ]")} {s}")
+
+    def profile_print(self, s):
+        print(f"{colorify.gray("[PROFILE ]")} {s}")
         
     def load_config(self):
         config_path = io.path_join(self.path, "_config.yaml")
@@ -68,12 +113,32 @@ class Gasper(FileSystemEventHandler):
         if os.path.exists(config_path):
             with open(config_path, "r") as f:
                 config = yaml.safe_load(f.read())
-        return config
+        return TrackedConfig(config or {})
     
+    def reload_config(self):
+        config = self.load_config()
+        if config == self.config:
+            return False
+        self.config = config
+        self.env.loader.config = config
+        # posts render their front matter with the site config
+        if self.posts is not None:
+            self.posts.clear()
+        return True
+
     def apply_filters(self):
         self.env.filters["slugify"] = slugify
+        self.env.filters["markdown"] = markdown
         self.env.globals["json"] = json
         
+    def set_tracker(self, tracker):
+        self.tracker = tracker
+        self.config.accessed = tracker.config if tracker is not None else None
+
+    def track_file(self, path):
+        if self.tracker is not None and path is not None:
+            self.tracker.files.add(path.replace("\\", "/"))
+
     def get_file_path_from_src_path(self, src_path):
         file_path = src_path.replace(self.path, "")
         if file_path.startswith("\\") or file_path.startswith("/"):
@@ -86,7 +151,15 @@ class Gasper(FileSystemEventHandler):
                 
         # dummy, _ = self.extract_frontmatter(file_path, prev_matter)
         # dummy.update(prev_matter)
-        matter, output = self.extract_frontmatter(file_path, prev_matter)
+        if prev_content is None:
+            # a page's own front matter is already rendered into prev_matter, which would replace every key of it
+            abspath = self.get_abspath(file_path)
+            self.track_file(abspath)
+            with self.profiler.stage("read"):
+                _, output = self.sources.get(abspath)
+            matter = {}
+        else:
+            matter, output = self.extract_frontmatter(file_path, prev_matter)
         
         if matter is None:
             matter = {}
@@ -94,83 +167,126 @@ class Gasper(FileSystemEventHandler):
         matter.update(prev_matter)
         try:
             self.global_matter = matter
-            if "parser" in matter and matter.get("parser") == "text":
-                content = self.env.from_string(output).render(page=matter, content=prev_content, site=self.config)
-            else:
-                content = markdown(self.env.from_string(output).render(page=matter, content=prev_content, site=self.config))
+            with self.profiler.stage("render" if prev_content is None else "layout", template=src_path):
+                content = self.templates.get(output, src_path).render(page=matter, content=prev_content, site=self.config)
+            if matter.get("parser") != "text":
+                with self.profiler.stage("markdown", template=src_path):
+                    content = markdown(content)
         except json.decoder.JSONDecodeError:
             print(f"Error: {matter["title"]}")
             return output
         
         if "layout" in matter:
-            if os.path.exists(io.path_join(self.path, "_layout", matter["layout"] + ".md")):
-                matter["layout"] = io.path_join(self.path, "_layout", matter["layout"] + ".md")
-            elif os.path.exists(io.path_join(self.path, "_layout", matter["layout"] + ".markdown")):
-                matter["layout"] = io.path_join(self.path, "_layout", matter["layout"] + ".markdown")
-            elif os.path.exists(io.path_join(self.path, "_layout", matter["layout"] + ".html")):
-                matter["layout"] = io.path_join(self.path, "_layout", matter["layout"] + ".html")
+            for extension in (".md", ".markdown", ".html"):
+                path = io.path_join(self.path, "_layout", matter["layout"] + extension)
+                # tracked even when missing, so adding a layout that takes precedence makes the page stale
+                self.track_file(path)
+                if os.path.exists(path):
+                    matter["layout"] = path
+                    break
             layout = matter.pop("layout")
             return self.generate_content(layout, content, matter)
         
         return content
     
-    def handle_generator_related(self, generator, rows, row, index):
-        related = {}
-        if generator["from"] == "mysql":
-            if generator.get("related"):
-                s = yaml.dump(generator.get("related")).replace("\\u2192\\u2192", "{{").replace("\\u2190\\u2190", "}}")
-                s = self.env.from_string(s).render(page={ 
-                    "generator": {
-                        "row": row,
-                        "index": index,
-                        "count": len(rows),
-                        "related": {},
-                        "rows": rows
-                    } 
-                }, content=None, site=self.config)
-                tmp_related = yaml.safe_load(s)
-                for r in tmp_related:
-                    related_rows = mysql_generate(self, generator["db"], r["table"], generator["host"], generator["port"], generator["username"], generator["password"], r.get("where"), r.get("limit"), r.get("order"), r.get("only"), r.get("unique", False))
-                    related[r["table"]] = related_rows
-        return related
+    def prefetch_related(self, generator, batch):
+        backend = get_backend(generator["from"])
+        if not hasattr(backend, "prefetch_related"):
+            return {}
+        return backend.prefetch_related(self, generator, batch)
+
+    def handle_generator_related(self, generator, rows, row, index, prefetched={}, count=None):
+        if count is None:
+            count = len(rows)
+        backend = get_backend(generator["from"])
+        if not hasattr(backend, "related_rows"):
+            return {}
+        return backend.related_rows(self, generator, rows, row, index, count, prefetched)
+
+    def compile_related(self, related):
+        # keyed by identity; the list is kept in the entry so its id can't be reused while cached
+        entry = self.specs.get(id(related))
+        if entry is None or entry[0] is not related:
+            entry = (related, compile_spec(self.templates, related))
+            self.specs[id(related)] = entry
+        return entry[1]
+
+    def render_related(self, spec, rows, row, index, count):
+        return render_spec(spec, { 
+            "page": {
+                "generator": {
+                    "row": row,
+                    "index": index,
+                    "count": count,
+                    "related": {},
+                    "rows": rows
+                }
+            },
+            "content": None,
+            "site": self.config
+        })
+
+    def get_dump(self, generator):
+        if not generator.get("dumpTo"):
+            return None
+        options = generator["dumpTo"]
+        if not isinstance(options, dict):
+            options = { "path": options }
+        self.task_print(f"Dumping to {options["path"]}")
+        return Dump(io.path_join("dist", options["path"]), options.get("shard"), options.get("compress"), options.get("layout", "rows"))
 
     def dumpTo(self, generator, rows, related):
-        if generator.get("dumpTo"):
-            self.task_print(f"Dumping to {generator.get("dumpTo")}")
-            dump_path = io.path_join("dist", generator["dumpTo"])
-            if not os.path.exists(os.path.dirname(dump_path)):
-                os.makedirs(os.path.dirname(dump_path))
-            
-            with open(dump_path, "wb+") as f:
-                f.write(json.dumps({ "rows": rows, "related": related }).encode("utf-8"))
+        dump = self.get_dump(generator)
+        if dump is not None:
+            try:
+                dump.write(rows)
+                self.outputs.update(dump.close(related))
+            except BaseException:
+                dump.abort()
+                raise
     
     def handle_generator(self, generator):
-        if generator["from"] == "mysql":
-            rows = mysql_generate(self, generator["db"], generator["table"], generator["host"], generator["port"], generator["username"], generator["password"], generator.get("where"), generator.get("limit"), generator.get("order"), generator.get("only"), generator.get("unique", False))
-
-            return rows
-        elif generator["from"] == "posts":
-            path = generator.get("path")
-            if path is None:
-                path = "_posts"
-            path = io.path_join(self.path, path)
-            posts = posts_generate(self, path)
-            return posts
-        
-    def generate(self, src_path, dist_path, permalink=None, init_matter={}):
-        html = self.generate_content(src_path, prev_content=None, prev_matter=init_matter)
+        with self.profiler.stage("generator", source=generator["from"]):
+            return get_backend(generator["from"]).rows(self, generator)
+
+    def get_streaming_backend(self, generator, hook):
+        backend = get_backend(generator["from"])
+        if not hasattr(backend, hook):
+            raise Exception(f"generator '{generator["from"]}' can't be used with {"stream" if hook == "stream_rows" else "paginate"}")
+        return backend
         
+    def generate(self, src_path, dist_path, permalink=None, init_matter={}, key=None):
         output_path = io.path_join(dist_path, "index.html")
         if permalink is not None:
             if permalink.split(".")[-1] in self.allowed_extension:
                 output_path = f"dist/{permalink}"
             else:
                 output_path = f"dist/{permalink}/index.html"
-            
-        if not os.path.exists(os.path.dirname(output_path)):
-            os.makedirs(os.path.dirname(output_path))
-        with open(output_path, "wb") as f:
-            f.write(html.encode("utf-8"))
+
+        if self.routes is not None:
+            self.routes[output_path] = { "src": src_path, "matter": init_matter, "files": set(self.tracker.files) if self.tracker is not None else set() }
+            self.rendered.pop(output_path, None)
+            return
+
+        if self.manifest is not None and self.manifest.is_fresh(output_path, src_path, key, self.config):
+            self.manifest.keep(output_path)
+            self.profiler.count("fresh")
+            self.progress.add("fresh")
+        else:
+            with self.profiler.page(output_path):
+                html = self.generate_content(src_path, prev_content=None, prev_matter=init_matter)
+
+                data = html.encode("utf-8")
+                self.writer.write(output_path, data)
+            self.profiler.count("pages")
+            self.profiler.count("bytes", len(data))
+            self.progress.add("rendered")
+
+            if self.manifest is not None:
+                self.manifest.record(output_path, src_path, key, self.tracker, self.config)
+            if self.args.verbose:
+                self.task_print(f"{src_path} → {output_path}")
+        self.outputs.add(output_path)
             
         if "sitemap" in self.config and init_matter.get("sitemap") != "ignore":
             nodes = list(pathlib.Path(output_path).parts)
@@ -180,58 +296,94 @@ class Gasper(FileSystemEventHandler):
             final_url = self.config.get("url") + "/" + "/".join(nodes)
             if len(nodes) > 0 and "." not in nodes[-1]:
                 final_url += "/"
-            self.sitemap.append(final_url)
-
-            s = f"""<?xml version="1.0" encoding="UTF-8"?>
-<urlset
-    xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
-    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-    xsi:schemaLocation="http://www.sitemaps.org/schemas/sitemap/0.9
-            http://www.sitemaps.org/schemas/sitemap/0.9/sitemap.xsd">
-            """
-            for m in self.sitemap:
-                level = "1.0"
-                parts = m.split(self.config.get("url"))
-                parts = parts[-1][1:].split("/")
-                if len(parts) <= 1:
-                    level = "1.0"
-                elif len(parts) <= 2:
-                    level = "0.8"
-                else:
-                    level = "0.7"
-                s += f"""<url>
-  <loc>{m}</loc>
-  <priority>{level}</priority>
-</url>
-"""
-            s += "</urlset>"
-            with open(io.path_join("dist", self.config.get("sitemap")), "wb+") as f:
-                f.write(s.encode("utf-8"))
-            
-        self.task_print(f"{src_path} → {output_path}")
+            lastmod = None
+            if self.config.get("sitemap_lastmod"):
+                lastmod = datetime.fromtimestamp(os.path.getmtime(src_path), timezone.utc).strftime("%Y-%m-%d")
+            self.sitemap[output_path] = (final_url, lastmod)
+
+    def write_sitemap(self):
+        entries = list(self.sitemap.values())
+        with self.profiler.stage("sitemap"):
+            paths = write_sitemap(io.path_join("dist", self.config.get("sitemap")), entries, self.config.get("url"))
+        self.outputs.update(paths)
 
-    def build(self):
+    def build(self, targets=None, cancel=None):
+        self.profiler = Profiler(self.args.profile)
+        self.writer.profiler = self.profiler
+        self.progress.start(show=not self.args.verbose)
+        self.outputs = set()
+        self.specs = {}
         if not os.path.exists("dist"):
             os.mkdir("dist")
         
-        only = None
-        if self.args.only:
-            only = io.path_join(self.path, self.args.only)
-        else:
-            io.clean_directory("dist", ["static", ".git", "CNAME"])
+        sweep = False
+        if self.args.only and targets is None:
+            targets = { os.path.abspath(io.path_join(self.path, self.args.only)) }
+        elif targets is None:
+            # outputs that are not produced again are removed after the build, so unchanged files keep their mtime
+            sweep = not self.built and (not self.args.incremental or not self.manifest.loaded)
+            self.sitemap = {}
         
             if os.path.exists(io.path_join(self.path, "_static")):
-                copytree(io.path_join(self.path, "_static"), io.path_join("dist", "static"))
+                with self.profiler.stage("static"):
+                    sync_tree(io.path_join(self.path, "_static"), io.path_join("dist", "static"))
         
         if not os.path.exists("dist"):
             os.mkdir("dist")
+        if self.manifest is not None:
+            self.manifest.begin()
+        self.queries.clear()
+        if self.posts is not None:
+            self.posts.reset()
+        self.jobs = int(self.args.jobs or 1)
+        if self.jobs > 1 and targets is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=init_worker, initargs=(self.path, self.args))
+        try:
+            for src_path, dist_path in self.walk(targets, cancel):
+                if self.is_verbatim(src_path):
+                    self.copy_verbatim(src_path, dist_path)
+                    continue
+                self.build_page(src_path, dist_path, cancel)
+            self.join_pool()
+            self.writer.flush()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+                self.pool = None
+                self.futures = []
+            for path in self.shared_rows:
+                os.remove(path)
+            self.shared_rows = []
+            self.writer.close()
+            close_backends()
+            self.queries.close()
+
+        if self.manifest is not None:
+            for output in self.manifest.remove_stale("dist", targets):
+                self.sitemap.pop(output, None)
+            self.manifest.save()
+        if "sitemap" in self.config and (self.built or not self.args.only):
+            self.write_sitemap()
+        if sweep:
+            io.sweep_directory("dist", self.outputs, ["static", ".git", "CNAME"])
+        self.built = True
+        self.progress.finish(self.task_print)
+        if self.profiler.enabled:
+            self.profiler.report(self.profile_print)
+            self.profiler.save(io.path_join(self.cache_path, "profile.json"))
+            self.profile_print(f"trace written to {io.path_join(self.cache_path, "profile.json")}")
+
+    def walk(self, targets=None, cancel=None):
+        """(source path, dist path) of every page in the site, or only of `targets` (absolute paths)."""
         for subdir, dirs, files in os.walk(self.path):
             for file in files:
                 if file.startswith("_"):
                     continue
                 src_path = io.path_join(subdir, file)
-                if only is not None and src_path != only:
+                if targets is not None and os.path.abspath(src_path) not in targets:
                     continue
+                if cancel is not None and cancel.is_set():
+                    raise BuildCancelled()
                 if ext.any_startswith("_", pathlib.Path(src_path).parts):
                     continue
                 dist_path = io.path_join(subdir, file).replace(self.path, "dist")
@@ -240,66 +392,380 @@ class Gasper(FileSystemEventHandler):
                 elif dist_path.endswith(".md") or dist_path.endswith(".html"):
                     file_name = pathlib.Path(dist_path).name
                     dist_path = io.path_join(os.path.dirname(dist_path), file_name.split(".md")[0].split(".html")[0].split(".markdown")[0])
-                                
-                file_path = self.get_file_path_from_src_path(src_path)
-                dummy, _ = self.extract_frontmatter(file_path, is_raw=True)
-                generator_copy = copy.deepcopy(dummy)
-                rows = None
-                related = {}
-                if "generator" in dummy:
-                    rows = self.handle_generator(dummy["generator"])
-
-                if dummy.get("generator", None) is not None and dummy["generator"].get("skip") == True:
-                    related = self.handle_generator_related(generator_copy["generator"], rows, None, -1)
-                    self.dumpTo(generator_copy["generator"], rows, related)
-                    dummy["generator"] = {
-                        "row": None,
-                        "index": -1,
-                        "count": len(rows),
-                        "related": related,
-                        "rows": rows
-                    }
-                    init_matter, _ = self.extract_frontmatter(file_path, dummy)
-                    init_matter["generator"] = dummy["generator"]
-                    self.generate(src_path, dist_path, init_matter.get("permalink", None), init_matter=init_matter)
-                elif rows is not None:
-                    total_rows = len(rows)
-                    for index, row in enumerate(rows):
-                        related = self.handle_generator_related(generator_copy["generator"], rows, row, index)
-                        dummy["generator"] = {
-                            "row": row,
-                            "index": index,
-                            "count": total_rows,
-                            "related": related,
-                            "rows": rows
-                        }
-                        init_matter, _ = self.extract_frontmatter(file_path, dummy)
-                        init_matter["generator"] = dummy["generator"]
-                        self.generate(src_path, dist_path, init_matter.get("permalink", None), init_matter=init_matter)
+                yield src_path, dist_path
+
+    def route(self, targets=None, cancel=None):
+        """Fill self.routes like a build would write dist, without rendering or writing any page."""
+        if targets is None:
+            self.routes = {}
+            self.rendered = {}
+        else:
+            for output, route in list(self.routes.items()):
+                if os.path.abspath(route["src"]) in targets:
+                    del self.routes[output]
+                    self.rendered.pop(output, None)
+        self.queries.clear()
+        if self.posts is not None:
+            self.posts.reset()
+        try:
+            for src_path, dist_path in self.walk(targets, cancel):
+                if self.is_verbatim(src_path):
+                    self.routes[dist_path] = { "src": src_path, "matter": None, "files": { src_path } }
+                    continue
+                self.build_page(src_path, dist_path, cancel)
+        finally:
+            close_backends()
+            self.queries.close()
+
+    def render_route(self, output_path):
+        with self.lock:
+            if output_path in self.rendered:
+                return self.rendered[output_path][0]
+            route = self.routes[output_path]
+            tracker = Tracker()
+            tracker.files.update(route["files"])
+            self.set_tracker(tracker)
+            try:
+                html = self.generate_content(route["src"], prev_content=None, prev_matter=route["matter"])
+            finally:
+                self.set_tracker(None)
+            self.rendered[output_path] = (html, tracker.files)
+            self.task_print(f"{route["src"]} → {output_path}")
+            return html
+
+    def invalidate(self, paths, cancel=None):
+        """Serve mode: re-route the pages whose routes read `paths` and forget the rendered pages that did."""
+        paths = [os.path.abspath(path) for path in paths]
+        uses = lambda files: any(path == file or path.startswith(file + os.sep) for file in map(os.path.abspath, files) for path in paths)
+        with self.lock:
+            if os.path.abspath(io.path_join(self.path, "_config.yaml")) in paths:
+                self.reload_config()
+                self.route(cancel=cancel)
+            else:
+                targets = { path for path in paths if not ext.any_startswith("_", pathlib.Path(os.path.relpath(path, os.path.abspath(self.path))).parts) }
+                targets.update(os.path.abspath(route["src"]) for route in self.routes.values() if uses(route["files"]))
+                for output, (html, files) in list(self.rendered.items()):
+                    if uses(files):
+                        del self.rendered[output]
+                if len(targets) > 0:
+                    self.route(targets, cancel)
+            self.task_print(f"{len(self.routes)} routes, {len(self.rendered)} pages cached")
+        if self.server is not None:
+            self.server.notify()
+
+    def serve(self):
+        from .core.server import DevServer
+        from .core.watcher import Watcher
+        start = time.perf_counter()
+        self.route()
+        self.success_print(f"{len(self.routes)} routes in {time.perf_counter() - start:.2f}s")
+        self.server = DevServer(self, int(self.args.port or 8080))
+        self.server.start()
+        delay = int(self.args.debounce or 300) / 1000
+        watcher = Watcher(self, delay, ignore=["dist", self.cache_path])
+        io.watch_directory(self.path, watcher)
+        watcher.stop()
+        self.server.stop()
+
+    def is_verbatim(self, src_path):
+        if src_path.split(".")[-1] in ("md", "markdown", "html"):
+            return False
+        stat = os.stat(src_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        entry = self.verbatim.get(src_path)
+        if entry is None or entry[0] != version:
+            with open(src_path, "rb") as f:
+                data = f.read()
+            entry = (version, b"---\n" not in data and b"{{" not in data and b"{%" not in data)
+            self.verbatim[src_path] = entry
+        return entry[1]
+
+    def copy_verbatim(self, src_path, output_path):
+        with self.profiler.stage("static"):
+            copied = sync_file(src_path, output_path)
+        self.progress.add("copied" if copied else "unchanged")
+        if copied and self.args.verbose:
+            self.task_print(f"{src_path} → {output_path}")
+        self.outputs.add(output_path)
+        if self.manifest is not None:
+            self.manifest.record(output_path, src_path, None, Tracker(), self.config)
+
+    def build_page(self, src_path, dist_path, cancel=None):
+        file_path = self.get_file_path_from_src_path(src_path)
+        page_tracker = Tracker()
+        self.set_tracker(page_tracker)
+        dummy, _ = self.extract_frontmatter(file_path, is_raw=True)
+        if self.pool is not None and (dummy.get("generator") is None or dummy["generator"].get("skip") == True or dummy["generator"].get("paginate") is not None):
+            self.set_tracker(None)
+            self.submit(render_page, src_path, dist_path)
+            return
+
+        # dummy["generator"] is replaced (never changed in place) once rows are rendered, so the spec can be shared
+        generator = dummy.get("generator")
+        rows = None
+        related = {}
+        if generator is not None and generator.get("paginate") is not None:
+            self.paginate_rows(src_path, dist_path, dummy, generator, page_tracker, cancel)
+            self.set_tracker(None)
+            return
+        if dummy.get("generator") is not None and dummy["generator"].get("stream") == True and dummy["generator"].get("skip") != True:
+            self.stream_rows(src_path, dist_path, dummy, generator, page_tracker, cancel)
+            self.set_tracker(None)
+            return
+        if "generator" in dummy:
+            rows = self.handle_generator(dummy["generator"])
+
+        if dummy.get("generator", None) is not None and dummy["generator"].get("skip") == True:
+            with self.profiler.stage("related"):
+                related = self.handle_generator_related(generator, rows, None, -1)
+            self.dumpTo(generator, rows, related)
+            dummy["generator"] = {
+                "row": None,
+                "index": -1,
+                "count": len(rows),
+                "related": related,
+                "rows": rows
+            }
+            self.set_tracker(Tracker(page_tracker))
+            init_matter = self.render_matter(file_path, dummy)
+            init_matter["generator"] = dummy["generator"]
+            self.generate(src_path, dist_path, init_matter.get("permalink", None), init_matter=init_matter, key=hash_value([self.hash_rows(rows), related]))
+        elif rows is not None:
+            rows_hash = self.hash_rows(rows) if self.manifest is not None else None
+            if self.pool is not None:
+                self.set_tracker(None)
+                size = max(1, math.ceil(len(rows) / (self.jobs * 4)))
+                rows_path = self.share_rows(rows)
+                for start in range(0, len(rows), size):
+                    self.submit(render_rows, src_path, dist_path, dummy, generator, rows[start:start + size], start, len(rows), rows_path, page_tracker, rows_hash)
+                return
+            self.render_rows(src_path, dist_path, dummy, generator, rows, 0, len(rows), rows, page_tracker, rows_hash, cancel)
+        else:
+            self.set_tracker(Tracker(page_tracker))
+            init_matter, _ = self.extract_frontmatter(file_path, dummy)
+            self.generate(src_path, dist_path, init_matter.get("permalink", None), init_matter=init_matter)
+        self.set_tracker(None)
+
+    def stream_rows(self, src_path, dist_path, dummy, generator, page_tracker, cancel=None):
+        backend = self.get_streaming_backend(generator, "stream_rows")
+        with self.profiler.stage("generator", source=generator["from"]):
+            total_rows = backend.count_rows(self, generator)
+        dump = self.get_dump(generator)
+        start = 0
+        try:
+            for batch in backend.stream_rows(self, generator):
+                if cancel is not None and cancel.is_set():
+                    raise BuildCancelled()
+                if dump is not None:
+                    dump.write(batch)
+                if self.pool is not None:
+                    self.submit(render_rows, src_path, dist_path, dummy, generator, batch, start, total_rows, None, page_tracker)
                 else:
-                    init_matter, _ = self.extract_frontmatter(file_path, dummy)
-                    self.generate(src_path, dist_path, init_matter.get("permalink", None), init_matter=init_matter)    
+                    self.render_rows(src_path, dist_path, dummy, generator, batch, start, total_rows, None, page_tracker, None, cancel)
+                start += len(batch)
+            if dump is not None:
+                self.outputs.update(dump.close())
+        except BaseException:
+            # a failed or cancelled build leaves the last complete dump, not a half-written .tmp next to it
+            if dump is not None:
+                dump.abort()
+            raise
 
-    def extract_frontmatter(self, path, prev_matter={}, is_raw=False, debug=False):
+    def get_pages(self, generator, size):
+        """(total rows, iterator over lists of at most `size` rows) for a paginated generator."""
+        backend = get_backend(generator["from"])
+        if hasattr(backend, "paginate_rows"):
+            with self.profiler.stage("generator", source=generator["from"]):
+                return backend.paginate_rows(self, generator, size)
+        rows = self.handle_generator(generator)
+        return len(rows), (rows[start:start + size] for start in range(0, len(rows), size))
+
+    def paginate_rows(self, src_path, dist_path, dummy, generator, page_tracker, cancel=None):
+        file_path = self.get_file_path_from_src_path(src_path)
+        size = int(generator["paginate"])
+        total_rows, pages = self.get_pages(generator, size)
+        total = max(1, math.ceil(total_rows / size))
+        base = "/".join(pathlib.Path(dist_path).parts[1:])
+        url = lambda number: f"/{base}/page/{number}/" if base else f"/page/{number}/"
+        number = 0
+        for rows in itertools.chain(pages, [[]]):
+            if number > 0 and len(rows) == 0:
+                break
+            if cancel is not None and cancel.is_set():
+                raise BuildCancelled()
+            number += 1
+            pagination = {
+                "page": number,
+                "per_page": size,
+                "total": total,
+                "total_rows": total_rows,
+                "prev_page": number - 1 if number > 1 else None,
+                "next_page": number + 1 if number < total else None,
+                "prev": url(number - 1) if number > 1 else None,
+                "next": url(number + 1) if number < total else None,
+                "url": url(number)
+            }
+            with self.profiler.stage("related"):
+                related = self.handle_generator_related(generator, rows, None, -1)
+            dummy["generator"] = {
+                "row": None,
+                "index": -1,
+                "count": total_rows,
+                "related": related,
+                "rows": rows,
+                "pagination": pagination
+            }
+            self.set_tracker(Tracker(page_tracker))
+            init_matter = self.render_matter(file_path, dummy)
+            init_matter["generator"] = dummy["generator"]
+            key = hash_value([self.hash_rows(rows), related, pagination])
+            permalink = init_matter.get("permalink", None)
+            self.generate(src_path, io.path_join(dist_path, "page", str(number)), permalink, init_matter=init_matter, key=key)
+            if number == 1 and permalink is None:
+                # the listing's own URL shows the first page too
+                self.generate(src_path, dist_path, None, init_matter=init_matter, key=key)
+
+    def hash_rows(self, rows):
+        # posts carry a hash of their source, so hashing them doesn't render their content
+        return hash_value([row._source.version if hasattr(row, "_source") else row for row in rows])
+
+    def render_rows(self, src_path, dist_path, dummy, generator, batch, start, total_rows, rows, page_tracker, rows_hash=None, cancel=None):
+        file_path = self.get_file_path_from_src_path(src_path)
+        with self.profiler.stage("related"):
+            prefetched = self.prefetch_related(generator, batch)
+        for index, row in enumerate(batch, start=start):
+            if cancel is not None and cancel.is_set():
+                raise BuildCancelled()
+            with self.profiler.stage("related"):
+                related = self.handle_generator_related(generator, rows, row, index, prefetched, total_rows)
+            dummy["generator"] = {
+                "row": row,
+                "index": index,
+                "count": total_rows,
+                "related": related,
+                "rows": rows
+            }
+            self.set_tracker(Tracker(page_tracker))
+            init_matter = self.render_matter(file_path, dummy)
+            init_matter["generator"] = dummy["generator"]
+            key = hash_value([rows_hash, total_rows, index, self.hash_rows([row]), related]) if self.manifest is not None else None
+            self.generate(src_path, dist_path, init_matter.get("permalink", None), init_matter=init_matter, key=key)
+        self.set_tracker(None)
+
+    def collect(self):
+        self.writer.flush()
+        sitemap = self.sitemap
+        self.sitemap = {}
+        outputs = self.outputs
+        self.outputs = set()
+        self.specs = {}
+        changes = self.manifest.take() if self.manifest is not None else {}
+        return sitemap, outputs, changes, self.profiler.take(), self.progress.take(), self.take_output()
+
+    def take_output(self):
+        if not self.is_worker:
+            return ""
+        output = sys.stdout.getvalue()
+        sys.stdout.seek(0)
+        sys.stdout.truncate()
+        return output
+
+    def share_rows(self, rows):
+        """Pickle a page's rows to a file, so each worker reads them once instead of every chunk carrying them."""
+        directory = io.path_join(self.cache_path, "rows")
+        os.makedirs(directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=".pickle", dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            # the pool's pickler, so posts go as they are for the workers to render
+            ForkingPickler(f, pickle.HIGHEST_PROTOCOL).dump(rows)
+        self.shared_rows.append(path)
+        return path
+
+    def submit(self, fn, *args):
+        self.futures.append(self.pool.submit(fn, *args))
+        if len(self.futures) > self.jobs * 4:
+            self.merge(self.futures.pop(0))
+
+    def merge(self, future):
+        sitemap, outputs, changes, profile, progress, output = future.result()
+        if output:
+            sys.stdout.write(output)
+        self.sitemap.update(sitemap)
+        self.outputs.update(outputs)
+        self.profiler.merge(profile)
+        self.progress.merge(progress)
+        if self.manifest is not None:
+            self.manifest.merge(changes)
+
+    def join_pool(self):
+        for future in self.futures:
+            self.merge(future)
+        self.futures = []
+
+    def rebuild(self, paths, cancel=None):
+        if self.routes is not None:
+            return self.invalidate(paths, cancel)
+        targets = set()
+        reload_config = False
+        sync_static = False
+        for path in paths:
+            parts = pathlib.Path(os.path.relpath(path, self.path)).parts
+            if parts == ("_config.yaml",):
+                reload_config = True
+            elif parts[0] == "_static":
+                sync_static = True
+            elif ext.any_startswith("_", parts):
+                targets.update(self.manifest.dependents([path]))
+            else:
+                targets.add(os.path.abspath(path))
+
+        if sync_static and os.path.exists(io.path_join(self.path, "_static")):
+            copied = sync_tree(io.path_join(self.path, "_static"), io.path_join("dist", "static"))
+            self.task_print(f"synced static files ({copied} copied)")
+        if reload_config:
+            self.reload_config()
+            self.build(cancel=cancel)
+        elif len(targets) > 0:
+            self.build(targets, cancel)
+
+    def get_abspath(self, path):
         if os.path.exists(path):
-            abspath = path
-        else:
-            abspath = io.path_join(self.path, path)
+            return path
+        return io.path_join(self.path, path)
+
+    def render_matter(self, path, prev_matter):
+        """A generator page's front matter for one row (or page of rows): the YAML is parsed once per page and only
+        the values that hold Jinja are rendered. `generator` is left out, the caller sets it."""
+        abspath = self.get_abspath(path)
+        self.track_file(abspath)
+        with self.profiler.stage("read"):
+            raw_matter, _ = self.sources.get(abspath)
+        if raw_matter is None:
+            return {}
+        with self.profiler.stage("frontmatter"):
+            # keyed by path, and compiled again when the source changes
+            entry = self.specs.get(abspath)
+            if entry is None or entry[0] != raw_matter:
+                entry = (raw_matter, compile_matter(self.templates, raw_matter))
+                self.specs[abspath] = entry
+            context = { "page": prev_matter, "content": None, "site": self.config }
+            return { key: render_spec(value, context) for key, value in entry[1].items() if key != "generator" }
+
+    def extract_frontmatter(self, path, prev_matter={}, is_raw=False, debug=False):
+        abspath = self.get_abspath(path)
 
-        with open(abspath, "r", encoding="utf-8") as f:
-            content = f.read()
+        self.track_file(abspath)
+        with self.profiler.stage("read"):
+            raw_matter, output = self.sources.get(abspath)
 
-        pattern = re.compile(r'---\n(.*?)\n---', re.DOTALL)
-        m = re.search(pattern, content)
         matter = {}
-        output = content
-        if m:
-            if is_raw:
-                s = m.group(1).replace("{{", "→→").replace("}}", "←←")
-            else:
-                s = self.env.from_string(m.group(1)).render(page=prev_matter, content=None, site=self.config)
-            matter = yaml.safe_load(s)
-            output = re.sub(pattern, "", output)
+        if raw_matter is not None:
+            with self.profiler.stage("frontmatter"):
+                if is_raw:
+                    s = raw_matter.replace("{{", "→→").replace("}}", "←←")
+                else:
+                    s = self.templates.get(raw_matter, abspath, "frontmatter").render(page=prev_matter, content=None, site=self.config)
+                matter = yaml.safe_load(s)
 
         return (matter, output)
     
@@ -308,7 +774,18 @@ class Gasper(FileSystemEventHandler):
         parser.add_argument(["--help", "-h"], description="show help", is_flag=True)
         parser.add_argument(["--watch", "-w"], description="build and watch for changes", is_flag=True)
         parser.add_argument(["--build", "-b"], description="build the site", is_flag=True)
+        parser.add_argument(["--serve", "-s"], description="serve the site from memory, rendering pages when requested", is_flag=True)
+        parser.add_argument(["--daemon"], description="stay resident with warm caches and run builds sent by --client", is_flag=True)
+        parser.add_argument(["--client"], description="send this build to the running daemon (builds here if there is none)", is_flag=True)
+        parser.add_argument(["--import-time"], description="report how long imports took, to keep startup fast", is_flag=True)
+        parser.add_argument(["--port"], example="N", description="port for --serve (default 8080)", pattern=r"^\d+$")
         parser.add_argument(["--only"], description="only build under this directory")
+        parser.add_argument(["--incremental", "-i"], description="only rebuild pages whose inputs changed", is_flag=True)
+        parser.add_argument(["--jobs", "-j"], example="N", description="render pages across N worker processes", pattern=r"^\d+$")
+        parser.add_argument(["--bytecode-cache"], description="keep compiled templates in .gasper-cache between builds", is_flag=True)
+        parser.add_argument(["--verbose", "-v"], description="print every file written", is_flag=True)
+        parser.add_argument(["--profile"], description="time each build stage and write .gasper-cache/profile.json", is_flag=True)
+        parser.add_argument(["--debounce"], example="ms", description="wait this long for more changes before rebuilding (default 300)", pattern=r"^\d+$")
         args = parser.parse()
         if len(sys.argv) < 1 or not os.path.exists(sys.argv[1]) or os.path.isfile(sys.argv[1]):
             parser.print_help()
@@ -322,7 +799,7 @@ class Gasper(FileSystemEventHandler):
         if self.path.endswith("\\") or self.path.endswith("/"):
             self.path = self.path[:-1]
         
-        if not args.watch and not args.build:
+        if not args.watch and not args.build and not args.serve and not args.daemon:
             parser.print_help()
             sys.exit(1) 
         
@@ -331,6 +808,42 @@ class Gasper(FileSystemEventHandler):
             args.only = args.only.replace("\\", "/")
         return args
     
+    def run_request(self, argv):
+        """Run a build for a client of the daemon, keeping every cache from the builds before it."""
+        daemon_argv = sys.argv
+        daemon_path = self.path
+        sys.argv = argv
+        try:
+            args = self.parse_arguments()
+        except SystemExit as e:
+            return e.code or 0
+        finally:
+            sys.argv = daemon_argv
+            path, self.path = self.path, daemon_path
+        if os.path.abspath(path) != os.path.abspath(self.path):
+            self.error_print(f"this daemon builds {self.path}, not {path}")
+            return 1
+        if not args.build or args.watch or args.serve or args.daemon:
+            self.error_print("the daemon only runs --build")
+            return 1
+
+        self.args = args
+        if args.incremental and self.manifest is None:
+            self.manifest = Manifest(io.path_join(self.cache_path, "manifest.json"))
+        elif not args.incremental:
+            self.manifest = None
+        # every request is a build of its own: sweep dist and write the sitemap as a single build would
+        self.built = False
+        self.reload_config()
+        start = time.perf_counter()
+        try:
+            self.build()
+        except Exception as e:
+            self.error_print(e)
+            return 1
+        self.success_print(f"built in {time.perf_counter() - start:.2f}s")
+        return 0
+
     def handle(self):
         try:
             self.build()
@@ -338,6 +851,7 @@ class Gasper(FileSystemEventHandler):
             self.error_print(e)
             
     def exit(self):
+        import requests
         print(self.is_terminated)
         while not self.is_terminated:
             time.sleep(1)
@@ -345,12 +859,21 @@ class Gasper(FileSystemEventHandler):
             print(r.status_code)
 
     def run(self):
-        if self.args.watch:
+        if self.args.daemon:
+            from .core.daemon import Daemon
+            Daemon(self, io.path_join(self.cache_path, "daemon.sock")).serve()
+        elif self.args.serve:
+            self.serve()
+        elif self.args.watch:
             self.handle()
             
             # http_server = io.MyHTTPServer("dist", 8080)
             # http_server.start()
-            io.watch_directory(self.path, self)
+            from .core.watcher import Watcher
+            delay = int(self.args.debounce or 300) / 1000
+            watcher = Watcher(self, delay, ignore=["dist", self.cache_path])
+            io.watch_directory(self.path, watcher)
+            watcher.stop()
 
             # try:
             #     inp = input("Do you really want quit? (Y/n) ").strip().lower()
@@ -364,12 +887,44 @@ class Gasper(FileSystemEventHandler):
             
         elif self.args.build:
             self.handle()
-            
-    def on_modified(self, event):
-        self.handle()
 
 
 
+worker = None
+
+
+def init_worker(path, args):
+    global worker
+    # what a worker prints goes back with its results for the parent to print, so it reaches the terminal or the
+    # daemon's client whatever stdout the worker started with
+    sys.stdout = sys.stderr = StringIO()
+    worker = Gasper(args, path)
+    worker.is_worker = True
+
+
+def render_page(src_path, dist_path):
+    worker.build_page(src_path, dist_path)
+    return worker.collect()
+
+
+# (path, rows) of the last shared rows file this worker read
+shared_rows = (None, None)
+
+
+def load_rows(path):
+    global shared_rows
+    if shared_rows[0] != path:
+        with open(path, "rb") as f:
+            shared_rows = (path, pickle.load(f))
+    return shared_rows[1]
+
+
+def render_rows(src_path, dist_path, dummy, generator, batch, start, total_rows, rows_path, *args):
+    rows = load_rows(rows_path) if rows_path is not None else None
+    worker.render_rows(src_path, dist_path, dummy, generator, batch, start, total_rows, rows, *args)
+    return worker.collect()
+
+
 def main():
     gasper = Gasper()
     gasper.run()
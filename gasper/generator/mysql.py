@@ -6,54 +6,435 @@ Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
 See the file 'LICENSE' for copying permission
 """
 
+import os
+import re
+from decimal import Decimal
 from peewee import *
+from playhouse.pool import PooledMySQLDatabase
 
+from ..core.manifest import hash_value
 
-def generate(gasper, db, table, host, port, username, password, where=None, limit=None, order=None, only=None, unique=False):
-    database = MySQLDatabase(db, host=host, port=port, user=username, passwd=password)
-    cursor = database.execute_sql(f"SHOW COLUMNS FROM {db}.{table};")
-    col_names = cursor.fetchall()
-    output = []
-    query = f"SELECT * FROM {table}"
+
+RELATED_ROW_PATTERN = re.compile(r"^\s*`?(\w+)`?\s*=\s*(['\"]?)→→\s*page\.generator\.row\.(\w+)\s*←←\2\s*$")
+PAGINATE_ORDER_PATTERN = re.compile(r"^\s*by\s+`?(\w+)`?(?:\s+(asc|desc))?\s*$", re.IGNORECASE)
+
+databases = {}
+columns = {}
+versions = {}
+
+
+def get_database(db, host, port, username, password):
+    key = (host, port, db, username)
+    if key not in databases:
+        databases[key] = PooledMySQLDatabase(db, host=host, port=port, user=username, passwd=password, max_connections=8, stale_timeout=300)
+    return databases[key]
+
+
+def get_stream_database(database):
+    """A database of its own, not pooled, with the same connection parameters as `database`."""
+    if isinstance(database, MySQLDatabase):
+        return MySQLDatabase(database.database, **database.connect_params)
+    return type(database)(database.database, **database.connect_params)
+
+
+def execute(gasper, database, query, params=None):
+    if gasper is None:
+        return database.execute_sql(query, params)
+    with gasper.profiler.query(query):
+        return database.execute_sql(query, params)
+
+
+def get_columns(gasper, database, db, table, host, port):
+    key = (host, port, db, table)
+    if key not in columns:
+        # FULL adds each column's collation (Field, Type, Collation, ...)
+        cursor = execute(gasper, database, f"SHOW FULL COLUMNS FROM {db}.{table};")
+        columns[key] = cursor.fetchall()
+    return columns[key]
+
+
+def close():
+    for database in databases.values():
+        database.close_all()
+    databases.clear()
+    columns.clear()
+    versions.clear()
+
+
+def forget():
+    # a forked --jobs worker must not share the parent's pooled connections (one socket, two conversations);
+    # they are dropped without closing so the parent's stay usable, and the worker connects on its own
+    databases.clear()
+    columns.clear()
+    versions.clear()
+
+
+os.register_at_fork(after_in_child=forget)
+
+
+def get_selected_columns(col_names, only=None):
+    names = [col[0] for col in col_names]
+    if only is None:
+        return names, "*"
+    cols = list(map(lambda x: x.strip(), only.split(",")))
+    names = [name for name in names if name in cols]
+    if len(names) == 0:
+        return names, "*"
+    return names, ", ".join(f"`{name}`" for name in names)
+
+
+def build_query(table, select, where=None, limit=None, order=None, distinct=False):
+    query = f"SELECT {"DISTINCT " if distinct else ""}{select} FROM {table}"
     if where:
         query += f" WHERE {where}"
     if order:
         query += f" ORDER {order}"
     if limit:
         query += f" LIMIT {limit}"
-    cursor = database.execute_sql(query)
-    for row in cursor.fetchall():
-        output.append({})
-        for i, col in enumerate(row):
-            output[-1][col_names[i][0]] = col
-    
-    if only is not None:
-        tmp = []
-        cols = list(map(lambda x: x.strip(), only.split(",")))
-        for out in output:
-            tmp.append({})
-            for k, v in out.items():
-                if k in cols:
-                    tmp[-1][k] = v
-        output = tmp
-        
-    if unique:
-        tmp = []
-        matches = []
-        for out in output:
-            m = "".join(map(lambda x: str(x), out.values()))
-            if m in matches:
+    return query
+
+
+def to_dicts(names, rows):
+    if len(names) == 0:
+        return [{} for _ in rows]
+    return [dict(zip(names, row)) for row in rows]
+
+
+def get_unique_columns(unique_by):
+    if unique_by is None:
+        return None
+    return list(map(lambda x: x.strip(), unique_by.split(",")))
+
+
+def get_collations(col_names, names):
+    """The collation of each of `names` (None for columns that don't hold text)."""
+    collations = { col[0]: col[2] if len(col) > 2 else None for col in col_names }
+    return [collations.get(name) for name in names]
+
+
+def is_exact_collation(collation):
+    # compares like Python's ==: no case or accent folding and no PAD SPACE ('a' = 'a ')
+    return collation is None or collation == "binary" or collation.endswith("_0900_bin")
+
+
+def can_use_distinct(unique, unique_by, only, order, limit, collations):
+    """Whether SELECT DISTINCT returns the rows that de-duplicating the query's rows in Python would keep.
+
+    Not with a `limit` (DISTINCT gives `limit` distinct rows, not the distinct rows among the first `limit`), nor on
+    columns whose collation treats unequal strings as equal.
+    """
+    if not unique or unique_by is not None or limit:
+        return False
+    # DISTINCT with an ORDER BY on a column that is not selected is rejected by MySQL
+    if order is not None and only is not None:
+        return False
+    return all(is_exact_collation(collation) for collation in collations)
+
+
+def get_distinct_key(name, collation):
+    return f"`{name}`" if is_exact_collation(collation) else f"CAST(`{name}` AS BINARY)"
+
+
+def unique_rows(rows, seen, columns=None):
+    output = []
+    for row in rows:
+        if columns is None:
+            key = tuple(row.values())
+        else:
+            key = tuple(row.get(col) for col in columns)
+        try:
+            if key in seen:
                 continue
-            matches.append(m)
-            tmp.append({})
-            for k, v in out.items():
-                tmp[-1][k] = v
-                    
-        output = tmp
+        except TypeError:
+            key = repr(key)
+            if key in seen:
+                continue
+        seen.add(key)
+        output.append(row)
+    return output
 
+
+def get_table_version(gasper, database, db, table, host, port, probe):
+    """A cheap value that changes whenever the table's data does: its CHECKSUM or the MAX() of a column."""
+    key = (host, port, db, table, probe)
+    if key not in versions:
+        if probe == "checksum":
+            cursor = execute(gasper, database, f"CHECKSUM TABLE {db}.{table};")
+            versions[key] = str(cursor.fetchone()[-1])
+        else:
+            cursor = execute(gasper, database, f"SELECT MAX(`{probe}`) FROM {table}")
+            versions[key] = str(cursor.fetchone()[0])
+    return versions[key]
+
+
+def generate(gasper, db, table, host, port, username, password, where=None, limit=None, order=None, only=None, unique=False, params=None, unique_by=None, cache=None):
+    database = get_database(db, host, port, username, password)
+    key = None
+    ttl = None
+    version = None
+    if gasper is not None:
+        key = hash_value(["mysql", host, port, db, table, where, limit, order, only, unique, unique_by, params])
+        if isinstance(cache, (int, float)) and not isinstance(cache, bool):
+            ttl = cache
+        elif isinstance(cache, str):
+            version = get_table_version(gasper, database, db, table, host, port, cache)
+        output = gasper.queries.get(key, ttl, version)
+        if output is not None:
+            return output
+
+    col_names = get_columns(gasper, database, db, table, host, port)
+    names, select = get_selected_columns(col_names, only)
+    distinct = can_use_distinct(unique, unique_by, only, order, limit, get_collations(col_names, names))
+    cursor = execute(gasper, database, build_query(table, select, where, limit, order, distinct), params)
+    output = to_dicts(names, cursor.fetchall())
+    if (unique and not distinct) or unique_by is not None:
+        output = unique_rows(output, set(), get_unique_columns(unique_by))
+    if key is not None:
+        gasper.queries.set(key, output, ttl, version)
     return output
 
 
+def count(gasper, db, table, host, port, username, password, where=None, limit=None, order=None, only=None, unique=False, params=None, unique_by=None):
+    database = get_database(db, host, port, username, password)
+    col_names = get_columns(gasper, database, db, table, host, port)
+    names, select = get_selected_columns(col_names, only)
+    distinct = can_use_distinct(unique, unique_by, only, order, limit, get_collations(col_names, names))
+    query = build_query(table, select, where, limit, order, distinct)
+    if unique_by is not None or (unique and not distinct):
+        # rows are de-duplicated in Python on these columns (a column that isn't selected is None in every row),
+        # compared byte for byte where the column's collation would fold case or trailing spaces
+        keys = [key for key in (get_unique_columns(unique_by) if unique_by is not None else names) if key in names]
+        keys = [get_distinct_key(key, collation) for key, collation in zip(keys, get_collations(col_names, keys))]
+        query = f"SELECT DISTINCT {", ".join(keys) or "1"} FROM ({query}) AS limited"
+    cursor = execute(gasper, database, f"SELECT COUNT(*) FROM ({query}) AS counted", params)
+    return cursor.fetchone()[0]
+
+
+def stream(gasper, db, table, host, port, username, password, where=None, limit=None, order=None, only=None, unique=False, params=None, unique_by=None, batch_size=1000):
+    """Yield the rows in batches from an unbuffered cursor on a connection of its own."""
+    database = get_database(db, host, port, username, password)
+    col_names = get_columns(gasper, database, db, table, host, port)
+    names, select = get_selected_columns(col_names, only)
+    distinct = can_use_distinct(unique, unique_by, only, order, limit, get_collations(col_names, names))
+    query = build_query(table, select, where, limit, order, distinct)
+    # the unbuffered cursor holds its connection until every row is read, so related queries made while the batches
+    # render can't share it
+    database = get_stream_database(database)
+    with database.connection_context():
+        if isinstance(database, MySQLDatabase):
+            from pymysql.cursors import SSCursor
+            cursor = database.connection().cursor(SSCursor)
+        else:
+            cursor = database.connection().cursor()
+        try:
+            if gasper is None:
+                cursor.execute(query, params or ())
+            else:
+                with gasper.profiler.query(query):
+                    cursor.execute(query, params or ())
+            seen = set()
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if len(rows) == 0:
+                    break
+                rows = to_dicts(names, rows)
+                if (unique and not distinct) or unique_by is not None:
+                    rows = unique_rows(rows, seen, get_unique_columns(unique_by))
+                if len(rows) > 0:
+                    yield rows
+        finally:
+            cursor.close()
+
+
+def get_pagination_key(order):
+    """(column, direction) to page on; `order` has to be a single `by column [asc|desc]`, `id` by default."""
+    if order is None:
+        return "id", "ASC"
+    m = PAGINATE_ORDER_PATTERN.match(order)
+    if m is None:
+        raise Exception(f"paginate needs order: by <column> [asc|desc] on a unique column, got '{order}'")
+    return m.group(1), (m.group(2) or "ASC").upper()
+
+
+def paginate(gasper, db, table, host, port, username, password, where=None, limit=None, order=None, only=None, unique=False, size=10, cache=None, unique_by=None):
+    """Yield pages of `size` rows, each fetched with `column > last value` (keyset) instead of an OFFSET."""
+    column, direction = get_pagination_key(order)
+    strip = False
+    if only is not None and column not in map(lambda x: x.strip(), only.split(",")):
+        only = only + "," + column
+        strip = True
+    # repeats are dropped across pages, so a page is topped up from the next fetch when some of its rows go
+    seen = set()
+    pending = []
+    last = None
+    fetched = 0
+    done = False
+    while True:
+        while len(pending) < size and not done:
+            size_left = size if limit is None else min(size, int(limit) - fetched)
+            if size_left <= 0:
+                done = True
+                break
+            # every page goes through the same %-formatting as generate(), so a `where` is read the same on each
+            conditions = [f"({where})"] if where else []
+            params = []
+            if last is not None:
+                conditions.append(f"`{column}` {">" if direction == "ASC" else "<"} %s")
+                params.append(last)
+            rows = generate(gasper, db, table, host, port, username, password, " AND ".join(conditions) or None, size_left, f"BY `{column}` {direction}", only, False, params, cache=cache)
+            if len(rows) < size_left:
+                done = True
+            if len(rows) == 0:
+                break
+            last = rows[-1][column]
+            fetched += len(rows)
+            if strip:
+                rows = [{ k: v for k, v in row.items() if k != column } for row in rows]
+            if unique or unique_by is not None:
+                rows = unique_rows(rows, seen, get_unique_columns(unique_by))
+            pending.extend(rows)
+        if len(pending) == 0:
+            break
+        yield pending[:size]
+        pending = pending[size:]
+
+
+def get_related_cache(generator, related):
+    # a MAX(column) probe names a column of the generator's own table, so only TTLs and checksums are inherited
+    cache = generator.get("cache")
+    if isinstance(cache, str) and cache != "checksum":
+        cache = None
+    return related.get("cache", cache)
+
+
+def get_related_key(related):
+    """(column, row field) if a raw `related` entry only filters on a field of the current row, otherwise None."""
+    where = related.get("where")
+    if not isinstance(where, str):
+        return None
+    m = RELATED_ROW_PATTERN.match(where)
+    if m is None:
+        return None
+    for key in ("table", "limit", "order", "only"):
+        if "→→" in str(related.get(key, "")):
+            return None
+    if related.get("limit") is not None and not str(related.get("limit")).strip().isdigit():
+        return None
+    return m.group(1), m.group(3)
+
+
+def get_integer_key(value):
+    """`value` as an int if it is a whole number, which SQL and Python compare alike, otherwise None.
+
+    Strings are left out: `IN` matches them by the column's collation (case, trailing spaces), a dict lookup doesn't.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, Decimal) and value.is_finite() and value == value.to_integral_value():
+        return int(value)
+    return None
+
+
+def generate_related(gasper, generator, related, column, values, batch_size=1000):
+    """Fetch the related rows for all integer `values` with `column IN (...)` queries, grouped by the value.
+
+    None if the column turns out not to hold whole numbers, in which case every row has to run its own query.
+    """
+    only = related.get("only")
+    cols = None
+    if only is not None:
+        cols = list(map(lambda x: x.strip(), only.split(",")))
+        if column not in cols:
+            only = only + "," + column
+
+    grouped = {}
+    values = list(values)
+    for start in range(0, len(values), batch_size):
+        chunk = values[start:start + batch_size]
+        where = f"{column} IN ({", ".join(["%s"] * len(chunk))})"
+        rows = generate(gasper, generator["db"], related["table"], generator["host"], generator["port"], generator["username"], generator["password"], where, None, related.get("order"), only, False, chunk, cache=get_related_cache(generator, related))
+        for row in rows:
+            key = get_integer_key(row[column])
+            if key is None:
+                return None
+            grouped.setdefault(key, []).append(row)
+
+    limit = related.get("limit")
+    for key, rows in grouped.items():
+        if cols is not None and column not in cols:
+            rows = [{ k: v for k, v in row.items() if k != column } for row in rows]
+        if related.get("unique", False) or related.get("unique_by") is not None:
+            rows = unique_rows(rows, set(), get_unique_columns(related.get("unique_by")))
+        if limit is not None:
+            rows = rows[:int(limit)]
+        grouped[key] = rows
+    return grouped
+
+
+# generator backend hooks, see generator/registry.py
+
+def get_generator_args(generator):
+    return (generator["db"], generator["table"], generator["host"], generator["port"], generator["username"], generator["password"], generator.get("where"), generator.get("limit"))
+
+
+def rows(gasper, generator):
+    return generate(gasper, *get_generator_args(generator), generator.get("order"), generator.get("only"), generator.get("unique", False), unique_by=generator.get("unique_by"), cache=generator.get("cache"))
+
+
+def count_rows(gasper, generator):
+    return count(gasper, *get_generator_args(generator), generator.get("order"), generator.get("only"), generator.get("unique", False), unique_by=generator.get("unique_by"))
+
+
+def stream_rows(gasper, generator):
+    return stream(gasper, *get_generator_args(generator), generator.get("order"), generator.get("only"), generator.get("unique", False), unique_by=generator.get("unique_by"))
+
+
+def paginate_rows(gasper, generator, size):
+    # counted in the order the pages are fetched in, so a `limit` covers the same rows
+    column, direction = get_pagination_key(generator.get("order"))
+    total_rows = count(gasper, *get_generator_args(generator), f"BY `{column}` {direction}", generator.get("only"), generator.get("unique", False), unique_by=generator.get("unique_by"))
+    return total_rows, paginate(gasper, *get_generator_args(generator), generator.get("order"), generator.get("only"), generator.get("unique", False), size, generator.get("cache"), generator.get("unique_by"))
+
+
+def prefetch_related(gasper, generator, batch):
+    prefetched = {}
+    for position, r in enumerate(generator.get("related") or []):
+        key = get_related_key(r)
+        if key is None:
+            continue
+        column, field = key
+        values = []
+        seen = set()
+        for row in batch:
+            value = get_integer_key(row.get(field))
+            if value is None:
+                break
+            if value not in seen:
+                seen.add(value)
+                values.append(value)
+        else:
+            grouped = generate_related(gasper, generator, r, column, values)
+            if grouped is not None:
+                prefetched[position] = (field, grouped)
+    return prefetched
+
+
+def related_rows(gasper, generator, rows, row, index, count, prefetched):
+    related = {}
+    if not generator.get("related"):
+        return related
+    spec = gasper.compile_related(generator["related"])
+    for position, r in enumerate(generator["related"]):
+        if position in prefetched:
+            field, grouped = prefetched[position]
+            related[r["table"]] = list(grouped.get(get_integer_key(row.get(field)), []))
+            continue
+        r = gasper.render_related(spec[position], rows, row, index, count)
+        related[r["table"]] = generate(gasper, generator["db"], r["table"], generator["host"], generator["port"], generator["username"], generator["password"], r.get("where"), r.get("limit"), r.get("order"), r.get("only"), r.get("unique", False), unique_by=r.get("unique_by"), cache=get_related_cache(generator, r))
+    return related
+
 
 if __name__ == "__main__":
     generate(db="automator", table="user", host="localhost", port=3306, username="root", password="rockjeev")
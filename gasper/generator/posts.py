@@ -8,45 +8,169 @@ See the file 'LICENSE' for copying permission
 
 import os
 from datetime import datetime
-from markdown import markdown
+from multiprocessing.reduction import ForkingPickler
+from ..core.converter import markdown
+
+from ..core.manifest import hash_value
+from ..core import io
+
+
+class Source:
+    """What a Post needs to render its content, kept off the post so templates only see front matter keys."""
+
+    def __init__(self, gasper, src_path, body, version):
+        self.gasper = gasper
+        self.src_path = src_path
+        self.body = body
+        self.version = version
+
+
+class Post(dict):
+    """A post's front matter; `content` is rendered the first time it is read."""
+
+    # Jinja looks up attributes before keys, so the only attribute is one no front matter would use
+    __slots__ = ("_source",)
+
+    def __init__(self, gasper, src_path, matter, body, version):
+        super().__init__(matter)
+        self._source = Source(gasper, src_path, body, version)
+
+    def __missing__(self, key):
+        if key != "content":
+            raise KeyError(key)
+        source = self._source
+        content = source.gasper.templates.get(source.body, source.src_path).render(page=dict(self), content=None, site=source.gasper.config)
+        if source.src_path.endswith(".md") or source.src_path.endswith(".markdown"):
+            content = markdown(content)
+        self["content"] = content
+        return content
+
+    def get(self, key, default=None):
+        if key == "content":
+            return self["content"]
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        return key == "content" or super().__contains__(key)
+
+    def keys(self):
+        self["content"]
+        return super().keys()
+
+    def values(self):
+        self["content"]
+        return super().values()
+
+    def items(self):
+        self["content"]
+        return super().items()
+
+    def __reduce__(self):
+        # pickled outside the --jobs pool (e.g. into a cache) as a plain dict of the front matter and content
+        return (dict, (dict(self.items()),))
+
+
+def reduce_post(post):
+    from .. import gasper
+    if gasper.worker is not None:
+        # a result sent back from a worker
+        return post.__reduce__()
+    # sent to --jobs workers as it is, so the content is rendered there (and only if a page reads it)
+    return (load_post, (dict(dict.items(post)), post._source.src_path, post._source.body, post._source.version))
+
+
+def load_post(matter, src_path, body, version):
+    from .. import gasper
+    return Post(gasper.worker, src_path, matter, body, version)
+
+
+# only what goes to the pool (its queues, and rows shared through a file) is pickled with ForkingPickler
+ForkingPickler.register(Post, reduce_post)
+
+
+class Posts:
+    """Posts parsed once and kept sorted by date (newest first); files are re-read only when they change."""
+
+    def __init__(self, gasper):
+        self.gasper = gasper
+        self.entries = {}
+        self.collections = {}
+
+    def load(self, src_path):
+        filename = os.path.basename(src_path)
+        nodes = filename.split("-")
+        year = int(nodes.pop(0))
+        month = int(nodes.pop(0))
+        day = int(nodes.pop(0))
+        
+        filename = "-".join(nodes)
+        date = datetime(year, month, day)
+        formated_date = date.strftime("%b %d, %Y")
+        
+        nodes = filename.split(".")
+        nodes.pop()
+        filename = ".".join(nodes)
+        
+        matter = {
+            "date": formated_date,
+            "filename": filename,
+            "permalink": f"{year}/{month}/{day}/{filename}"
+        }
+        dummy = matter
+        for _ in range(2):
+            (dummy, _) = self.gasper.extract_frontmatter(src_path, dummy, debug=True)
+        (init_matter, body) = self.gasper.extract_frontmatter(src_path, dummy, debug=True)
+        matter.update(init_matter)
+        version = hash_value(self.gasper.sources.get(src_path))
+        return (date, filename), Post(self.gasper, src_path, matter, body, version)
+
+    def get(self, path):
+        if path in self.collections:
+            return self.collections[path]
+
+        found = set()
+        for subdir, dirs, files in os.walk(path):
+            for file in files:
+                src_path = os.path.join(subdir, file)
+                stat = os.stat(src_path)
+                version = (stat.st_mtime_ns, stat.st_size)
+                found.add(src_path)
+                entry = self.entries.get(src_path)
+                if entry is None or entry[0] != version:
+                    sort_key, post = self.load(src_path)
+                    self.entries[src_path] = (version, sort_key, post)
+
+        prefix = os.path.join(path, "")
+        for src_path in list(self.entries):
+            if src_path.startswith(prefix) and src_path not in found:
+                del self.entries[src_path]
+
+        entries = sorted((self.entries[src_path] for src_path in found), key=lambda entry: entry[1], reverse=True)
+        self.collections[path] = [entry[2] for entry in entries]
+        return self.collections[path]
+
+    def reset(self):
+        self.collections = {}
+        for version, sort_key, post in self.entries.values():
+            post.pop("content", None)
+
+    def clear(self):
+        self.collections = {}
+        self.entries = {}
 
 
 def generate(gasper, path):
-    output = []
-    for subdir, dirs, files in os.walk(path):
-        for file in files:
-            src_path = os.path.join(subdir, file)
-            filename = os.path.basename(src_path)
-            nodes = filename.split("-")
-            year = int(nodes.pop(0))
-            month = int(nodes.pop(0))
-            day = int(nodes.pop(0))
-            
-            filename = "-".join(nodes)
-            date = datetime(year, month, day)
-            formated_date = date.strftime("%b %d, %Y")
-            
-            nodes = filename.split(".")
-            nodes.pop()
-            filename = ".".join(nodes)
-            
-            matter = {
-                "date": formated_date,
-                "filename": filename,
-                "permalink": f"{year}/{month}/{day}/{filename}"
-            }
-            dummy = matter
-            for _ in range(2):
-                (dummy, _) = gasper.extract_frontmatter(src_path, dummy, debug=True)
-            (init_matter, content) = gasper.extract_frontmatter(src_path, dummy, debug=True)
-            matter.update(init_matter)
-            
-            content = gasper.env.from_string(content).render(page=matter, content=None, site=gasper.config)
-            
-            if src_path.endswith(".md") or src_path.endswith(".markdown"):
-                content = markdown(content)
-            
-            matter["content"] = content
-            output.append(matter)
-    
-    return output
\ No newline at end of file
+    if gasper.posts is None:
+        gasper.posts = Posts(gasper)
+    return gasper.posts.get(path)
+
+
+# generator backend hook, see generator/registry.py
+
+def rows(gasper, generator):
+    path = generator.get("path")
+    if path is None:
+        path = "_posts"
+    path = io.path_join(gasper.path, path)
+    gasper.track_file(path)
+    return generate(gasper, path)
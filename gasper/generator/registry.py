@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import importlib
+
+
+# built-in backends, by `generator: from:` name
+BACKENDS = {
+    "mysql": ".mysql",
+    "posts": ".posts",
+    "http": ".remote"
+}
+
+# other packages add backends with an entry point in this group, e.g. csv = "gasper_csv:backend"
+ENTRY_POINT_GROUP = "gasper.generators"
+
+backends = {}
+
+
+def get_backend(name):
+    """The backend for `generator: from: <name>`, imported the first time a page uses it.
+
+    A backend is a module or object with `rows(gasper, generator)` and optionally `count_rows` and `stream_rows`
+    (for `stream: true`), `paginate_rows(gasper, generator, size)`, `prefetch_related`, `related_rows` and `close()`.
+    """
+    if name in backends:
+        return backends[name]
+    if name in BACKENDS:
+        backend = importlib.import_module(BACKENDS[name], __package__)
+    else:
+        from importlib.metadata import entry_points
+        found = list(entry_points(group=ENTRY_POINT_GROUP, name=name))
+        if len(found) == 0:
+            raise Exception(f"unknown generator '{name}', no backend is installed for it in the '{ENTRY_POINT_GROUP}' entry point group")
+        backend = found[0].load()
+    backends[name] = backend
+    return backend
+
+
+def close():
+    for backend in backends.values():
+        if hasattr(backend, "close"):
+            backend.close()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright (c) 2024 suyambu developers (http://suyambu.net/gasper)
+See the file 'LICENSE' for copying permission
+"""
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from ..core.manifest import hash_value
+from ..core import io
+
+
+RETRY_STATUS = (408, 425, 429, 500, 502, 503, 504)
+
+sessions = {}
+
+
+class Response:
+    def __init__(self, url, body, next_url=None):
+        self.url = url
+        self.body = body
+        self.next_url = next_url
+
+
+def get_session(concurrency):
+    """A requests session with a connection pool as large as the number of requests in flight."""
+    if concurrency not in sessions:
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency, pool_block=True)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        sessions[concurrency] = session
+    return sessions[concurrency]
+
+
+def close():
+    for session in sessions.values():
+        session.close()
+    sessions.clear()
+
+
+# like the mysql pools, a forked --jobs worker opens its own connections instead of sharing the parent's sockets
+os.register_at_fork(after_in_child=sessions.clear)
+
+
+def get_path(data, path):
+    """The value at a dotted `path` (e.g. data.items or results.0.id) in a JSON document, or None."""
+    if path is None:
+        return data
+    for part in str(path).split("."):
+        if isinstance(data, dict):
+            data = data.get(part)
+        elif isinstance(data, list) and part.lstrip("-").isdigit() and -len(data) <= int(part) < len(data):
+            data = data[int(part)]
+        else:
+            return None
+    return data
+
+
+def get_rows(body, path):
+    rows = get_path(body, path)
+    if rows is None:
+        return []
+    if not isinstance(rows, list):
+        return [rows]
+    return rows
+
+
+class Client:
+    """GETs JSON concurrently from an asyncio loop: at most `concurrency` requests in flight over one connection pool,
+    failed requests retried with backoff, and responses kept in .gasper-cache/http and revalidated with ETag/Last-Modified."""
+
+    def __init__(self, gasper, generator):
+        self.gasper = gasper
+        self.concurrency = max(1, int(generator.get("concurrency", 8)))
+        self.retries = int(generator.get("retries", 3))
+        self.timeout = float(generator.get("timeout", 30))
+        self.backoff = float(generator.get("backoff", 0.5))
+        self.headers = generator.get("headers") or {}
+        cache = generator.get("cache")
+        self.ttl = cache if isinstance(cache, (int, float)) and not isinstance(cache, bool) else None
+        self.cache_path = io.path_join(gasper.cache_path, "http")
+        self.session = get_session(self.concurrency)
+        self.executor = None
+        self.semaphore = None
+
+    async def __aenter__(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_cache_file(self, key):
+        return io.path_join(self.cache_path, key[:2], key + ".json")
+
+    def read_cache(self, key):
+        try:
+            with open(self.get_cache_file(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_cache(self, key, entry):
+        path = self.get_cache_file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def request(self, url, params, headers):
+        with self.gasper.profiler.span("request", url, params=params):
+            self.gasper.profiler.count("requests")
+            return self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+
+    async def get(self, url, params=None):
+        params = params or {}
+        key = hash_value(["http", url, params, self.headers])
+        response = self.gasper.queries.get(key)
+        if response is not None:
+            return response
+
+        cached = self.read_cache(key)
+        if cached is not None and self.ttl is not None and time.time() - cached["fetched"] <= self.ttl:
+            response = Response(cached["url"], cached["body"], cached["next"])
+            self.gasper.queries.set(key, response)
+            return response
+
+        headers = dict(self.headers)
+        if cached is not None and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached is not None and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            delay = self.backoff * 2 ** attempt
+            try:
+                async with self.semaphore:
+                    r = await loop.run_in_executor(self.executor, self.request, url, params, headers)
+                if r.status_code not in RETRY_STATUS:
+                    break
+                retry_after = r.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+                error = Exception(f"GET {r.url} failed with {r.status_code}")
+            except OSError as e:
+                # requests' ConnectionError and Timeout are IOErrors
+                error = Exception(f"GET {url} failed: {e}")
+            if attempt >= self.retries:
+                raise error
+            attempt += 1
+            self.gasper.profiler.count("retries")
+            await asyncio.sleep(delay)
+
+        if r.status_code == 304 and cached is not None:
+            self.gasper.profiler.count("not_modified")
+            cached["fetched"] = time.time()
+            self.write_cache(key, cached)
+            response = Response(cached["url"], cached["body"], cached["next"])
+        else:
+            if r.status_code >= 400:
+                raise Exception(f"GET {r.url} failed with {r.status_code}")
+            next_url = r.links.get("next", {}).get("url")
+            response = Response(r.url, r.json(), urljoin(r.url, next_url) if next_url else None)
+            if r.headers.get("ETag") or r.headers.get("Last-Modified") or self.ttl is not None:
+                self.write_cache(key, {
+                    "url": response.url,
+                    "etag": r.headers.get("ETag"),
+                    "last_modified": r.headers.get("Last-Modified"),
+                    "fetched": time.time(),
+                    "next": response.next_url,
+                    "body": response.body
+                })
+        self.gasper.queries.set(key, response)
+        return response
+
+    async def get_all(self, requests):
+        return await asyncio.gather(*(self.get(url, params) for url, params in requests))
+
+
+async def fetch_rows(client, generator):
+    url = generator["url"]
+    params = dict(generator.get("params") or {})
+    path = generator.get("rows")
+    limit = generator.get("limit")
+    limit = int(limit) if limit is not None else None
+    is_full = lambda rows: limit is not None and len(rows) >= limit
+
+    pages = generator.get("pages")
+    follow = generator.get("next")
+    if pages:
+        # numbered pages: fetched `concurrency` at a time, or all at once when the first page tells how many there are
+        if not isinstance(pages, dict):
+            pages = { "param": pages }
+        param = pages.get("param", "page")
+        number = int(pages.get("start", 1))
+        first = await client.get(url, { **params, param: number })
+        rows = get_rows(first.body, path)
+        last = get_path(first.body, pages["last"]) if pages.get("last") else None
+        if last is not None:
+            responses = await client.get_all([(url, { **params, param: n }) for n in range(number + 1, int(last) + 1)])
+            for response in responses:
+                rows.extend(get_rows(response.body, path))
+        else:
+            done = len(rows) == 0
+            while not done and not is_full(rows):
+                window = range(number + 1, number + 1 + client.concurrency)
+                responses = await client.get_all([(url, { **params, param: n }) for n in window])
+                number = window[-1]
+                for response in responses:
+                    page_rows = get_rows(response.body, path)
+                    if len(page_rows) == 0:
+                        done = True
+                        break
+                    rows.extend(page_rows)
+    elif follow:
+        # a next link, from the Link header or at a dotted path in the body; each page names the next one, so one at a time
+        response = await client.get(url, params)
+        rows = get_rows(response.body, path)
+        seen = { response.url }
+        while not is_full(rows):
+            next_url = response.next_url if follow == "link" else get_path(response.body, follow)
+            if not next_url or urljoin(response.url, next_url) in seen:
+                break
+            response = await client.get(urljoin(response.url, next_url))
+            seen.add(response.url)
+            rows.extend(get_rows(response.body, path))
+    else:
+        rows = get_rows((await client.get(url, params)).body, path)
+
+    return rows[:limit] if limit is not None else rows
+
+
+def run(gasper, generator, coroutine):
+    async def main():
+        async with Client(gasper, generator) as client:
+            return await coroutine(client)
+    return asyncio.run(main())
+
+
+def rows(gasper, generator):
+    return run(gasper, generator, lambda client: fetch_rows(client, generator))
+
+
+def get_related_request(related):
+    return related["url"], related.get("params") or {}
+
+
+def get_related_name(related):
+    return related.get("name", related["url"])
+
+
+def prefetch_related(gasper, generator, batch):
+    """Every row's `related` requests for the batch, made concurrently, keyed by the rendered url and params."""
+    if not generator.get("related") or len(batch) == 0:
+        return {}
+    spec = gasper.compile_related(generator["related"])
+    requests = {}
+    for index, row in enumerate(batch):
+        for r in gasper.render_related(spec, batch, row, index, len(batch)):
+            url, params = get_related_request(r)
+            requests[hash_value([url, params])] = (url, params)
+
+    async def fetch(client):
+        responses = await client.get_all(requests.values())
+        return dict(zip(requests.keys(), responses))
+    return run(gasper, generator, fetch)
+
+
+def related_rows(gasper, generator, rows, row, index, count, prefetched):
+    related = {}
+    if not generator.get("related"):
+        return related
+    spec = gasper.compile_related(generator["related"])
+    missing = []
+    for r in gasper.render_related(spec, rows, row, index, count):
+        url, params = get_related_request(r)
+        response = prefetched.get(hash_value([url, params]))
+        if response is None:
+            missing.append(r)
+            continue
+        related[get_related_name(r)] = get_rows(response.body, r.get("rows"))
+    if len(missing) > 0:
+        # pages without rows, or urls that depend on the row's index in the whole list rather than the batch
+        responses = run(gasper, generator, lambda client: client.get_all([get_related_request(r) for r in missing]))
+        for r, response in zip(missing, responses):
+            related[get_related_name(r)] = get_rows(response.body, r.get("rows"))
+    return related
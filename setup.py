@@ -23,7 +23,7 @@ setup(
     ],
     entry_points={
         "console_scripts": [
-            "gasper = gasper.gasper:main"
+            "gasper = gasper.cli:main"
         ]
     },
     classifiers=[
@@ -0,0 +1,74 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import sqlite_mysql
+import stub_api as stub
+from gasper.generator import mysql
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """An SQLite file that every mysql generator reads instead of a MySQL server; returns its sqlite3 connection."""
+    path = str(tmp_path / "data.db")
+    db = sqlite3.connect(path)
+    monkeypatch.setattr(sqlite_mysql, "path", path)
+    monkeypatch.setattr(mysql, "PooledMySQLDatabase", sqlite_mysql.SQLiteMySQL)
+    yield db
+    mysql.close()
+    db.close()
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """Work in `tmp_path` (dist and .gasper-cache are relative to the working directory) and write files under site/."""
+    monkeypatch.chdir(tmp_path)
+
+    def write(name, content):
+        path = tmp_path / "site" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+        return path
+
+    (tmp_path / "site").mkdir()
+    return write
+
+
+@pytest.fixture
+def build(site):
+    """Run `gasper site --build <options>` in the site's directory and return the Gasper that built it."""
+    from gasper.gasper import Gasper
+
+    def run(*options):
+        argv = sys.argv
+        sys.argv = ["gasper", "site", "--build", *options]
+        try:
+            gasper = Gasper()
+        finally:
+            sys.argv = argv
+        gasper.build()
+        return gasper
+
+    return run
+
+
+@pytest.fixture
+def stub_api():
+    """Start benchmarks/stub_api.py on a free port; call it with StubAPI options, e.g. stub_api(posts=20)."""
+    servers = []
+
+    def start(**options):
+        servers.append(stub.start(**options))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,80 @@
+import threading
+
+
+def test_write_stage_is_timed_on_the_writer_thread(build, site):
+    for name in ("index.html", "about.html", "contact.html"):
+        site(name, f"<p>{name}</p>")
+    gasper = build("--profile")
+    writes = [event for event in gasper.profiler.events if event["cat"] == "stage" and event["name"] == "write"]
+    assert len(writes) == 3
+    assert all(event["tid"] != threading.get_ident() for event in writes)
+
+
+def test_bytecode_cache_holds_every_template(build, site, monkeypatch):
+    from gasper.core.loader import GasperEnvironment
+
+    site("_layout/base.html", "---\ntitle: {{ page.title }}\n---\n<title>{{ page.title }}</title>{{ content }}{% include 'footer.html' %}")
+    site("_include/footer.html", "<footer>{{ site.name }}</footer>")
+    site("_config.yaml", "name: test\n")
+    site("index.html", "---\ntitle: {{ 'Home' | upper }}\nlayout: base\n---\n<p>{{ page.title }}</p>")
+    site("about.html", "---\ntitle: {{ 'About' | upper }}\nlayout: base\n---\n<p>{{ page.title }}</p>")
+
+    compiled = []
+    compile = GasperEnvironment.compile
+    monkeypatch.setattr(GasperEnvironment, "compile", lambda self, source, *args, **kwargs: compiled.append(source) or compile(self, source, *args, **kwargs))
+    build("--bytecode-cache")
+    assert len(compiled) > 0
+    first = open("dist/index.html").read()
+
+    compiled.clear()
+    build("--bytecode-cache")
+    assert compiled == []
+    assert open("dist/index.html").read() == first
+
+
+ROW_PAGE = """---
+title: {{ page.generator.row.name | title }}
+permalink: items/{{ page.generator.row.id }}
+position: {{ page.generator.index + 1 }}
+generator:
+    from: mysql
+    db: test
+    host: localhost
+    port: 3306
+    username: user
+    password: password
+    table: item
+---
+<h1>{{ page.title }}</h1><p>{{ page.position }} of {{ page.generator.count }}, next {{ page.generator.rows[page.generator.index + 1].name if page.position < page.generator.count else "none" }}</p>
+"""
+
+
+def test_row_front_matter_is_parsed_once_per_page(build, site, sqlite_db, monkeypatch):
+    from gasper import gasper as gasper_module
+
+    sqlite_db.execute("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)")
+    sqlite_db.executemany("INSERT INTO item VALUES (?, ?)", [(1, "apple"), (2, "pear"), (3, "fig")])
+    sqlite_db.commit()
+    site("index.html", ROW_PAGE)
+
+    compiled = []
+    compile_matter = gasper_module.compile_matter
+    monkeypatch.setattr(gasper_module, "compile_matter", lambda templates, raw: compiled.append(raw) or compile_matter(templates, raw))
+    build()
+    assert len(compiled) == 1
+    assert open("dist/items/1/index.html").read().replace("\n", "") == "<h1>Apple</h1><p>1 of 3, next pear</p>"
+    assert open("dist/items/3/index.html").read().replace("\n", "") == "<h1>Fig</h1><p>3 of 3, next none</p>"
+
+
+def test_worker_output_reaches_the_parents_stdout(build, site):
+    import contextlib
+    import io
+
+    for name in ("index.html", "about.html", "contact.html"):
+        site(name, f"<p>{name}</p>")
+    output = io.StringIO()
+    # like a daemon build, whose stdout is its client's socket
+    with contextlib.redirect_stdout(output):
+        build("--jobs", "2", "--verbose")
+    for name in ("index.html", "about.html", "contact.html"):
+        assert f"{name} → dist" in output.getvalue()
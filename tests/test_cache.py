@@ -0,0 +1,48 @@
+from gasper.core.cache import QueryCache
+
+
+def test_query_cache_returns_rows_of_their_own(tmp_path):
+    cache = QueryCache(str(tmp_path / "queries.db"))
+    rows = [{ "id": 1 }]
+    cache.set("key", rows)
+    rows[0]["id"] = 2
+    first = cache.get("key")
+    first[0]["id"] = 3
+    first.append({ "id": 4 })
+    assert cache.get("key") == [{ "id": 1 }]
+    cache.close()
+
+
+def test_query_cache_keeps_the_most_recently_used(tmp_path):
+    cache = QueryCache(str(tmp_path / "queries.db"), size=2)
+    cache.set("a", [1])
+    cache.set("b", [2])
+    cache.get("a")
+    cache.set("c", [3])
+    assert list(cache.results) == ["a", "c"]
+    assert cache.get("b") is None
+    cache.close()
+
+
+def test_query_cache_reads_evicted_persistent_results_back(tmp_path):
+    cache = QueryCache(str(tmp_path / "queries.db"), size=1)
+    cache.set("a", [{ "id": 1 }], ttl=60)
+    cache.set("b", [{ "id": 2 }], ttl=60)
+    assert "a" not in cache.results
+    assert cache.get("a", ttl=60) == [{ "id": 1 }]
+    assert list(cache.results) == ["a"]
+    cache.close()
+
+
+def test_query_cache_clear_drops_build_and_expired_results(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("gasper.core.cache.time.time", lambda: now[0])
+    cache = QueryCache(str(tmp_path / "queries.db"))
+    cache.set("build", [1])
+    cache.set("short", [2], ttl=10)
+    cache.set("long", [3], ttl=100)
+    cache.set("versioned", [4], version="1")
+    now[0] += 50
+    cache.clear()
+    assert list(cache.results) == ["long", "versioned"]
+    cache.close()
@@ -0,0 +1,39 @@
+import os
+
+from gasper.core.copytree import sync_tree
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def listing(path):
+    return sorted(os.path.relpath(os.path.join(subdir, name), path) for subdir, dirs, files in os.walk(path) for name in files + dirs)
+
+
+def test_sync_tree_copies_only_changed_files(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    write(src / "a.css", "a")
+    write(src / "img" / "b.png", "b")
+    assert sync_tree(str(src), str(dst)) == 2
+    assert sync_tree(str(src), str(dst)) == 0
+
+    write(src / "a.css", "changed")
+    assert sync_tree(str(src), str(dst)) == 1
+    assert (dst / "a.css").read_text() == "changed"
+
+
+def test_sync_tree_removes_files_gone_from_the_source(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    write(src / "a.css", "a")
+    write(src / "img" / "b.png", "b")
+    write(src / "fonts" / "deep" / "c.woff", "c")
+    sync_tree(str(src), str(dst))
+
+    os.remove(src / "img" / "b.png")
+    os.remove(src / "fonts" / "deep" / "c.woff")
+    os.rmdir(src / "fonts" / "deep")
+    assert sync_tree(str(src), str(dst)) == 0
+    # directories left empty go too
+    assert listing(dst) == ["a.css"]
@@ -0,0 +1,32 @@
+import json
+import os
+import socket
+import sys
+
+from gasper.core.daemon import Daemon
+
+
+def test_daemon_sends_worker_output_to_the_client(site, monkeypatch):
+    from gasper.gasper import Gasper
+
+    for name in ("index.html", "about.html", "contact.html"):
+        site(name, f"<p>{name}</p>")
+    monkeypatch.setattr(sys, "argv", ["gasper", "site", "--daemon"])
+    gasper = Gasper()
+
+    server, client = socket.socketpair()
+    request = { "argv": ["gasper", "site", "--build", "--jobs", "2", "--verbose"], "cwd": os.getcwd() }
+    client.sendall((json.dumps(request) + "\n").encode("utf-8"))
+    with server:
+        Daemon(gasper, "daemon.sock").handle(server)
+
+    output = ""
+    with client:
+        for line in client.makefile("r", encoding="utf-8"):
+            message = json.loads(line)
+            if "status" in message:
+                assert message["status"] == 0
+                break
+            output += message["out"]
+    for name in ("index.html", "about.html", "contact.html"):
+        assert f"{name} → dist" in output
@@ -0,0 +1,65 @@
+import datetime
+import gzip
+import json
+import os
+
+import pytest
+
+from gasper.core.dump import Dump
+
+
+def listing(path):
+    return sorted(os.listdir(path))
+
+
+def test_failed_dump_leaves_no_tmp_files(tmp_path):
+    path = str(tmp_path / "api" / "rows.json")
+    dump = Dump(path, compress="gzip")
+    dump.write([{ "id": 1 }])
+    dump.close()
+    before = open(path).read()
+
+    dump = Dump(path, compress="gzip")
+    with pytest.raises(TypeError):
+        try:
+            dump.write([{ "id": 2 }, { "id": 3, "at": datetime.datetime.now() }])
+        except BaseException:
+            dump.abort()
+            raise
+    assert listing(tmp_path / "api") == ["rows.json", "rows.json.gz"]
+    assert open(path).read() == before
+
+
+def test_failed_related_leaves_no_tmp_files(tmp_path):
+    path = str(tmp_path / "rows.json")
+    dump = Dump(path, shard=1)
+    dump.write([{ "id": 1 }, { "id": 2 }])
+    with pytest.raises(TypeError):
+        try:
+            dump.close({ "at": datetime.datetime.now() })
+        except BaseException:
+            dump.abort()
+            raise
+    assert not any(name.endswith(".tmp") for name in listing(tmp_path))
+
+
+ROWS = [
+    { "id": 1, "title": "Hello", "tags": ["a", "b"], "score": 1.5, "draft": False, "extra": None },
+    { "id": 2, "title": "Ünïcode → “quotes”", "tags": [], "score": 0, "draft": True, "extra": { "nested": [1, 2] } },
+    { "id": 3, "title": "line\nbreak \"escaped\" \\", "tags": ["c"], "score": -2, "draft": False, "extra": None },
+]
+
+
+@pytest.mark.parametrize("batches", [[], [ROWS], [ROWS[:1], ROWS[1:]], [[row] for row in ROWS]])
+def test_dump_matches_a_single_json_dumps(tmp_path, batches):
+    # what dumpTo wrote before it streamed rows
+    rows = [row for batch in batches for row in batch]
+    related = [{ "name": "authors", "rows": [{ "id": 7, "name": "Ann" }] }]
+    path = str(tmp_path / "rows.json")
+    dump = Dump(path, compress="gzip")
+    for batch in batches:
+        dump.write(batch)
+    dump.close(related)
+    expected = json.dumps({ "rows": rows, "related": related }).encode("utf-8")
+    assert open(path, "rb").read() == expected
+    assert gzip.decompress(open(path + ".gz", "rb").read()) == expected
@@ -0,0 +1,132 @@
+import os
+
+from gasper.core.manifest import Manifest, Tracker, TrackedConfig, WHOLE_CONFIG
+
+
+def rendered(gasper):
+    return gasper.progress.counts.get("rendered", 0)
+
+
+def test_tracked_config_records_every_kind_of_read():
+    config = TrackedConfig({ "title": "Site", "url": "http://example.com" })
+    tracker = Tracker()
+    config.accessed = tracker.config
+    config["title"]
+    config.get("missing")
+    "url" in config
+    assert tracker.config == { "title", "missing", "url" }
+    for read in (list, len, lambda c: c.items(), lambda c: c.keys(), lambda c: c.values()):
+        tracker.config.clear()
+        read(config)
+        assert tracker.config == { WHOLE_CONFIG }
+
+
+def test_manifest_freshness(tmp_path):
+    src = tmp_path / "page.html"
+    src.write_text("a")
+    output = tmp_path / "out.html"
+    output.write_text("out")
+    config = TrackedConfig({ "title": "Site" })
+    tracker = Tracker()
+    tracker.files.add(str(src))
+    tracker.config.add("title")
+
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+    assert not manifest.loaded
+    manifest.record(str(output), str(src), "key", tracker, config)
+    manifest.save()
+
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+    assert manifest.loaded
+    assert manifest.is_fresh(str(output), str(src), "key", config)
+    assert not manifest.is_fresh(str(output), str(src), "other key", config)
+    assert not manifest.is_fresh(str(output), str(src), "key", TrackedConfig({ "title": "Other" }))
+    # keys the output didn't read don't matter
+    assert manifest.is_fresh(str(output), str(src), "key", TrackedConfig({ "title": "Site", "url": "x" }))
+
+    src.write_text("b")
+    manifest.begin()
+    assert not manifest.is_fresh(str(output), str(src), "key", config)
+
+
+def test_manifest_hashes_directory_listings(tmp_path):
+    posts = tmp_path / "_posts"
+    posts.mkdir()
+    (posts / "2024-01-01-a.md").write_text("a")
+    output = tmp_path / "out.html"
+    output.write_text("out")
+    tracker = Tracker()
+    tracker.files.add(str(posts))
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+    manifest.record(str(output), "src", None, tracker, {})
+    manifest.begin()
+    assert manifest.is_fresh(str(output), "src", None, {})
+
+    (posts / "2024-01-02-b.md").write_text("b")
+    manifest.begin()
+    assert not manifest.is_fresh(str(output), "src", None, {})
+
+
+def test_remove_stale_outputs(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+    dist = tmp_path / "dist"
+    dist.mkdir()
+    for name in ("a.html", "b.html"):
+        (dist / name).write_text(name)
+        manifest.record(str(dist / name), "src", None, Tracker(), {})
+    manifest.begin()
+    manifest.keep(str(dist / "a.html"))
+    assert manifest.remove_stale(str(dist)) == [str(dist / "b.html")]
+    assert os.listdir(dist) == ["a.html"]
+
+
+def test_incremental_build_reads_config_through_iteration(build, site):
+    site("_config.yaml", "title: Site\n")
+    site("index.html", "{% for key, value in site.items() %}{{ key }}={{ value }};{% endfor %}")
+    site("about.html", "about")
+    build("--incremental")
+    gasper = build("--incremental")
+    assert rendered(gasper) == 0
+
+    site("_config.yaml", "title: Site\nauthor: Me\n")
+    gasper = build("--incremental")
+    assert rendered(gasper) == 1
+    assert "author=Me" in open("dist/index.html").read()
+
+
+def test_incremental_build_picks_up_a_layout_that_takes_precedence(build, site):
+    site("_layout/base.html", "<div>html {{ content }}</div>")
+    site("index.html", "---\nlayout: base\n---\nhello")
+    build("--incremental")
+    assert "html" in open("dist/index.html").read()
+
+    site("_layout/base.md", "md {{ content }}")
+    gasper = build("--incremental")
+    assert rendered(gasper) == 1
+    assert "md" in open("dist/index.html").read()
+
+
+def test_first_incremental_build_sweeps_old_outputs(build, site):
+    site("index.html", "home")
+    os.makedirs("dist/old")
+    with open("dist/old/index.html", "w") as f:
+        f.write("left from an earlier build")
+    build("--incremental")
+    assert not os.path.exists("dist/old/index.html")
+    assert os.path.exists("dist/index.html")
+
+
+def test_incremental_build_rerenders_only_pages_that_read_a_changed_file(build, site):
+    site("_include/footer.html", "<footer>one</footer>")
+    site("index.html", "home{% include 'footer.html' %}")
+    site("about.html", "about")
+    gasper = build("--incremental")
+    assert rendered(gasper) == 2
+
+    site("_include/footer.html", "<footer>two</footer>")
+    gasper = build("--incremental")
+    assert rendered(gasper) == 1
+    assert "two" in open("dist/index.html").read()
+
+    gasper = build("--incremental")
+    assert rendered(gasper) == 0
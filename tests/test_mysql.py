@@ -0,0 +1,160 @@
+import pytest
+
+from gasper.generator import mysql
+
+
+ARGS = ("test", "item", "localhost", 3306, "user", "password")
+
+ITEMS = [
+    (1, "a", 1, "x"),
+    (2, "a", 1, "x"),
+    (3, "b", 2, "x"),
+    (4, "A", 1, "y"),
+    (5, "a ", 1, "y"),
+    (6, "b", 2, "x"),
+    (7, "c", None, "z"),
+    (8, "c", None, "z"),
+    (9, "a", 1, "x"),
+    (10, "d", 3, "y"),
+]
+
+
+@pytest.fixture
+def items(sqlite_db):
+    sqlite_db.execute("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT, groupId INTEGER, kind TEXT)")
+    sqlite_db.executemany("INSERT INTO item VALUES (?, ?, ?, ?)", ITEMS)
+    sqlite_db.commit()
+    return [dict(zip(("id", "name", "groupId", "kind"), item)) for item in ITEMS]
+
+
+def dedupe(rows, columns):
+    """What baseline `unique` kept: the first row of each exact combination of `columns`, in query order."""
+    seen = set()
+    output = []
+    for row in rows:
+        key = tuple(row[column] for column in columns)
+        if key not in seen:
+            seen.add(key)
+            output.append({ column: row[column] for column in row })
+    return output
+
+
+def generate(**options):
+    return mysql.generate(None, *ARGS, **options)
+
+
+def count(**options):
+    return mysql.count(None, *ARGS, **options)
+
+
+def only(rows, columns):
+    return [{ column: row[column] for column in columns } for row in rows]
+
+
+def test_unique_keeps_exact_duplicates_apart(items):
+    rows = generate(only="name,groupId", unique=True)
+    expected = dedupe(only(items, ["name", "groupId"]), ["name", "groupId"])
+    assert sorted(map(repr, rows)) == sorted(map(repr, expected))
+    # 'A' and 'a ' are not duplicates of 'a'
+    assert { row["name"] for row in rows } == { "a", "A", "a ", "b", "c", "d" }
+    assert count(only="name,groupId", unique=True) == len(expected)
+
+
+def test_unique_with_limit_dedupes_the_first_rows(items):
+    rows = generate(only="name,groupId", order="BY id", unique=True, limit=6)
+    expected = dedupe(only(items[:6], ["name", "groupId"]), ["name", "groupId"])
+    assert rows == expected
+    assert len(rows) == 4
+    assert count(only="name,groupId", order="BY id", unique=True, limit=6) == 4
+
+
+def test_unique_with_limit_is_not_a_distinct_query(items, monkeypatch):
+    queries = []
+    execute = mysql.execute
+    monkeypatch.setattr(mysql, "execute", lambda gasper, database, query, params=None: queries.append(query) or execute(gasper, database, query, params))
+    generate(only="name", unique=True, limit=3)
+    assert not any("DISTINCT" in query for query in queries)
+
+
+def test_unique_by(items):
+    rows = generate(order="BY id", unique_by="name")
+    assert rows == dedupe(items, ["name"])
+    assert count(order="BY id", unique_by="name") == len(rows)
+    rows = generate(order="BY id", unique_by="groupId, kind", limit=8)
+    assert rows == dedupe(items[:8], ["groupId", "kind"])
+    assert count(order="BY id", unique_by="groupId, kind", limit=8) == len(rows)
+
+
+def test_unique_by_column_that_is_not_selected(items):
+    # the column is None in every row, so only the first row is kept
+    assert generate(only="name", order="BY id", unique_by="kind") == [{ "name": "a" }]
+    assert count(only="name", order="BY id", unique_by="kind") == 1
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    { "unique": True },
+    { "unique": True, "only": "name" },
+    { "unique": True, "only": "name", "order": "BY id DESC" },
+    { "unique": True, "only": "kind", "limit": 4 },
+    { "unique_by": "kind" },
+    { "unique_by": "name,kind", "limit": 7, "order": "BY id" },
+    { "where": "groupId = 1", "unique": True, "only": "name" },
+])
+def test_count_matches_generate_and_stream(items, options):
+    rows = generate(**options)
+    streamed = [row for batch in mysql.stream(None, *ARGS, batch_size=3, **options) for row in batch]
+    assert count(**options) == len(rows) == len(streamed)
+
+
+def test_can_use_distinct():
+    assert mysql.can_use_distinct(True, None, None, None, None, [None, "utf8mb4_0900_bin", "binary"])
+    assert not mysql.can_use_distinct(True, None, None, None, 10, [None])
+    assert not mysql.can_use_distinct(True, None, None, None, None, [None, "utf8mb4_general_ci"])
+    assert not mysql.can_use_distinct(True, None, None, None, None, ["latin1_bin"])
+    assert not mysql.can_use_distinct(True, "name", None, None, None, [None])
+    assert not mysql.can_use_distinct(True, None, "name", "BY id", None, [None])
+    assert not mysql.can_use_distinct(False, None, None, None, None, [None])
+
+
+def test_distinct_key_compares_folding_collations_as_bytes():
+    assert mysql.get_distinct_key("name", "utf8mb4_general_ci") == "CAST(`name` AS BINARY)"
+    assert mysql.get_distinct_key("name", "utf8mb4_0900_bin") == "`name`"
+    assert mysql.get_distinct_key("id", None) == "`id`"
+
+
+def paginate(**options):
+    return [page for page in mysql.paginate(None, *ARGS, **options)]
+
+
+def test_paginate_reads_where_the_same_on_every_page(items):
+    # like every query, `where` is %-formatted by the driver, so a literal % is written %%
+    where = "id %% 3 != 0"
+    pages = paginate(where=where, order="BY id", size=2)
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert [row for page in pages for row in page] == generate(where=where, order="BY id")
+
+
+def test_stream_leaves_the_pool_to_queries_made_between_batches(items):
+    streamed = []
+    for batch in mysql.stream(None, *ARGS, order="BY id", batch_size=3):
+        streamed.extend(batch)
+        assert generate(where=f"id = {batch[0]["id"]}") == [batch[0]]
+    assert streamed == items
+
+
+@pytest.mark.parametrize("options, columns", [
+    ({ "only": "name", "unique": True }, ["name"]),
+    ({ "unique_by": "name" }, ["name"]),
+    ({ "unique_by": "groupId,kind", "limit": 8 }, ["groupId", "kind"]),
+])
+def test_paginate_drops_repeats_across_pages(items, options, columns):
+    # repeats fall on later pages than their first row, and each page is topped up to its size
+    pages = paginate(order="BY id", size=2, **options)
+    rows = [row for page in pages for row in page]
+    expected = dedupe(items[:options.get("limit")], columns)
+    if "only" in options:
+        expected = only(expected, columns)
+    assert rows == expected
+    assert all(len(page) == 2 for page in pages[:-1])
+    assert len(rows) == sum(map(len, pages)) == count(order="BY id", **options)
@@ -0,0 +1,36 @@
+import pickle
+
+from multiprocessing.reduction import ForkingPickler
+
+from gasper import gasper as gasper_module
+from gasper.generator.posts import Post
+
+
+def make_post(gasper):
+    return Post(gasper, "site/_posts/2024-01-01-hello.md", { "title": "Hello" }, "# {{ page.title }}", 1)
+
+
+def test_post_pickles_as_a_dict_outside_the_pool(build, site):
+    site("index.html", "home")
+    post = make_post(build())
+    loaded = pickle.loads(pickle.dumps(post))
+    assert type(loaded) is dict
+    assert loaded["title"] == "Hello"
+    assert "Hello" in loaded["content"]
+
+
+def test_post_goes_to_workers_unrendered(build, site, monkeypatch):
+    site("index.html", "home")
+    gasper = build()
+    post = make_post(gasper)
+    data = ForkingPickler.dumps(post)
+    assert "content" not in dict(dict.items(post))
+
+    # unpickled in a worker, the post renders its content there
+    monkeypatch.setattr(gasper_module, "worker", gasper)
+    loaded = pickle.loads(data)
+    assert isinstance(loaded, Post)
+    assert "content" not in dict(dict.items(loaded))
+    assert "Hello" in loaded["content"]
+    # and goes back to the parent as a dict
+    assert type(pickle.loads(ForkingPickler.dumps(loaded))) is dict
@@ -0,0 +1,122 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pytest
+
+from gasper.generator import remote
+
+
+@pytest.fixture
+def gasper(build, site):
+    site("index.html", "home")
+    gasper = build()
+    yield gasper
+    remote.close()
+
+
+def posts_generator(api, **options):
+    return { "from": "http", "url": f"{api.url}/posts", "params": { "per_page": 7 }, "rows": "data", "pages": { "param": "page", "last": "meta.last_page" }, "backoff": 0.01, **options }
+
+
+def test_not_modified_reuses_the_cached_body(gasper, stub_api):
+    api = stub_api(posts=20)
+    rows = remote.rows(gasper, posts_generator(api))
+    assert [row["id"] for row in rows] == list(range(1, 21))
+    assert api.not_modified == 0
+
+    # a later build asks again with If-None-Match and reads the body from .gasper-cache/http
+    gasper.queries.clear()
+    assert remote.rows(gasper, posts_generator(api)) == rows
+    assert api.not_modified == 3
+    assert api.requests == 6
+
+
+def test_cache_ttl_skips_revalidation(gasper, stub_api):
+    api = stub_api(posts=5)
+    rows = remote.rows(gasper, posts_generator(api, cache=600))
+    gasper.queries.clear()
+    assert remote.rows(gasper, posts_generator(api, cache=600)) == rows
+    assert api.requests == 1
+
+
+def test_failed_requests_are_retried(gasper, stub_api):
+    api = stub_api(posts=30, fail_every=3)
+    rows = remote.rows(gasper, posts_generator(api))
+    assert [row["id"] for row in rows] == list(range(1, 31))
+    assert api.requests > 5
+
+
+def test_errors_are_raised_after_the_last_retry(gasper, stub_api):
+    api = stub_api(fail_every=1)
+    with pytest.raises(Exception, match="failed with 503"):
+        remote.rows(gasper, posts_generator(api, retries=2))
+    assert api.requests == 3
+
+    api = stub_api()
+    with pytest.raises(Exception, match="failed with 404"):
+        remote.rows(gasper, { "from": "http", "url": f"{api.url}/missing" })
+    assert api.requests == 1
+
+
+def test_fan_out_keeps_page_and_request_order(gasper, stub_api):
+    api = stub_api(posts=50, latency=0.01)
+    rows = remote.rows(gasper, posts_generator(api, concurrency=4))
+    assert [row["id"] for row in rows] == list(range(1, 51))
+
+    # pages without a `last` are fetched a window at a time until one comes back empty
+    generator = posts_generator(api, concurrency=3)
+    del generator["pages"]["last"]
+    assert remote.rows(gasper, generator) == rows
+
+    # as it comes from the page's raw front matter
+    generator = { **posts_generator(api), "related": [{ "name": "comments", "url": "→→ page.generator.row.url ←←" }] }
+    batch = [{ "url": f"{api.url}/posts/{number}/comments" } for number in (5, 1, 3)]
+    prefetched = remote.prefetch_related(gasper, generator, batch)
+    related = [remote.related_rows(gasper, generator, batch, row, index, len(batch), prefetched) for index, row in enumerate(batch)]
+    assert [[comment["post"] for comment in r["comments"]] for r in related] == [[5] * 3, [1] * 3, [3] * 3]
+
+
+def session_count():
+    return len(remote.sessions)
+
+
+def test_forked_workers_open_their_own_sessions(stub_api):
+    remote.get_session(4)
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("fork")) as pool:
+            assert pool.submit(session_count).result() == 0
+        assert session_count() == 1
+    finally:
+        remote.close()
+
+
+def test_jobs_build_with_related_requests(build, site, stub_api):
+    api = stub_api(posts=12, comments=2)
+    site("post.html", f"""---
+title: {{{{ page.generator.row.title }}}}
+permalink: posts/{{{{ page.generator.row.slug }}}}
+generator:
+    from: http
+    url: {api.url}/posts
+    params:
+        per_page: 5
+    rows: data
+    pages:
+        param: page
+        last: meta.last_page
+    related:
+        -
+            name: comments
+            url: {api.url}/posts/{{{{ page.generator.row.id }}}}/comments
+---
+<h1>{{{{ page.title }}}}</h1>{{% for comment in page.generator.related.comments %}}<p>{{{{ comment.text }}}}</p>{{% endfor %}}
+""")
+    try:
+        build("--jobs", "2")
+    finally:
+        remote.close()
+    for number in range(1, 13):
+        html = open(f"dist/posts/post-{number}/index.html").read()
+        assert f"<h1>Post {number}</h1>" in html
+        assert f"Comment 2 on post {number}" in html
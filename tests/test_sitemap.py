@@ -0,0 +1,62 @@
+import os
+
+from gasper.core import sitemap
+from gasper.core.sitemap import write_sitemap
+
+
+BASE_URL = "http://example.com"
+
+
+def entries(count):
+    return [(f"{BASE_URL}/page-{n}/", None) for n in range(count)]
+
+
+def sitemap_path(tmp_path, monkeypatch):
+    # the build passes paths under its output directory, which the index's locations are relative to
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("dist/feeds")
+    return "dist/feeds/sitemap.xml"
+
+
+def urls_in(path):
+    return open(path, encoding="utf-8").read().count("<url>")
+
+
+def test_small_sitemap_is_one_urlset(tmp_path, monkeypatch):
+    path = sitemap_path(tmp_path, monkeypatch)
+    assert write_sitemap(path, entries(3), BASE_URL) == [path]
+    assert urls_in(path) == 3
+    assert open(path).read().endswith("</urlset>")
+
+
+def test_sitemap_splits_by_url_count(tmp_path, monkeypatch):
+    monkeypatch.setattr(sitemap, "URLS_PER_SITEMAP", 10)
+    path = sitemap_path(tmp_path, monkeypatch)
+    paths = write_sitemap(path, entries(25), BASE_URL)
+    assert [os.path.basename(p) for p in paths] == ["sitemap.xml", "sitemap-1.xml", "sitemap-2.xml", "sitemap-3.xml"]
+    assert [urls_in(p) for p in paths[1:]] == [10, 10, 5]
+    index = open(path).read()
+    assert index.count("<sitemap>") == 3
+    assert f"<loc>{BASE_URL}/feeds/sitemap-3.xml</loc>" in index
+
+
+def test_sitemap_splits_by_size(tmp_path, monkeypatch):
+    urlset = len(sitemap.URLSET_HEADER.encode("utf-8")) + len(sitemap.URLSET_FOOTER)
+    element = len(sitemap.format_url(f"{BASE_URL}/page-0/", None, BASE_URL).encode("utf-8"))
+    monkeypatch.setattr(sitemap, "BYTES_PER_SITEMAP", urlset + 4 * element)
+    path = sitemap_path(tmp_path, monkeypatch)
+    paths = write_sitemap(path, entries(10), BASE_URL)
+    assert [urls_in(p) for p in paths[1:]] == [4, 4, 2]
+    assert all(os.path.getsize(p) <= sitemap.BYTES_PER_SITEMAP for p in paths[1:])
+
+
+def test_shrinking_sitemap_removes_old_children(tmp_path, monkeypatch):
+    monkeypatch.setattr(sitemap, "URLS_PER_SITEMAP", 10)
+    path = sitemap_path(tmp_path, monkeypatch)
+    write_sitemap(path, entries(25), BASE_URL)
+    assert write_sitemap(path, entries(15), BASE_URL)[1:] == ["dist/feeds/sitemap-1.xml", "dist/feeds/sitemap-2.xml"]
+    assert not os.path.exists("dist/feeds/sitemap-3.xml")
+
+    write_sitemap(path, entries(5), BASE_URL)
+    assert os.listdir("dist/feeds") == ["sitemap.xml"]
+    assert urls_in(path) == 5
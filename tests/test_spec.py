@@ -0,0 +1,51 @@
+import datetime
+
+import yaml
+from jinja2 import Environment
+
+from gasper.core.cache import TemplateCache
+from gasper.core.spec import compile_matter, render_spec
+
+
+RAW_MATTER = """title: {{ page.generator.row.title }}
+slug: "{{ page.generator.row.id }}"
+number: {{ page.generator.row.id }}
+ratio: {{ page.generator.row.id / 4 }}
+draft: {{ page.generator.row.id > 1 }}
+empty: {{ page.generator.row.missing }}
+date: {{ page.generator.row.date }}
+tags: [{{ page.generator.row.tag }}, fixed]
+heading: Post {{ page.generator.row.id }} of {{ page.generator.count }}
+kind: is {% if page.generator.row.id > 1 %}later{% else %}first{% endif %}
+quoted: '{{ page.generator.row.title }}: quoted'
+block: |
+    {{ page.generator.row.title }}
+    second line
+nested:
+    name: {{ page.generator.row.title | upper }}
+    plain: text
+layout: post"""
+
+
+def context(row):
+    return { "page": { "generator": { "row": row, "count": 2 } }, "content": None, "site": {} }
+
+
+def test_matter_renders_like_the_whole_front_matter_through_jinja_and_yaml():
+    env = Environment()
+    spec = compile_matter(TemplateCache(env), RAW_MATTER)
+    for row in ({ "id": 1, "title": "Hello", "tag": "a", "date": "2024-01-02" }, { "id": 2, "title": "World", "tag": "7", "date": "2024-03-04" }):
+        expected = yaml.safe_load(env.from_string(RAW_MATTER).render(context(row)))
+        assert render_spec(spec, context(row)) == expected
+
+
+def test_matter_keeps_yaml_types():
+    spec = compile_matter(TemplateCache(Environment()), RAW_MATTER)
+    matter = render_spec(spec, context({ "id": 2, "title": "Hi", "tag": "x", "date": "2024-01-02" }))
+    assert matter["slug"] == "2"
+    assert matter["number"] == 2
+    assert matter["ratio"] == 0.5
+    assert matter["draft"] is True
+    assert matter["empty"] is None
+    assert matter["date"] == datetime.date(2024, 1, 2)
+    assert matter["tags"] == ["x", "fixed"]